@@ -1,14 +1,23 @@
-from fastapi import FastAPI
-from fastapi.openapi.utils import validation_error_response_definition
+from typing import TYPE_CHECKING
 
-from app.api.routes import router as api_router
-from app.core.config import get_settings
-from app.core.handlers import register_handlers
-from app.core.lifecycle import lifespan
-from app.core.middlewares import register_middlewares
+if TYPE_CHECKING:
+    from fastapi import FastAPI
 
 
-def create_app() -> FastAPI:
+def create_app() -> "FastAPI":
+    # 在函数内导入：仅导入 app.core.config 等子模块时（如 run.py、热重载与多进程模式下的主进程）不加载整个应用
+    from fastapi import FastAPI
+    from fastapi.openapi.utils import validation_error_response_definition
+    from fastapi.responses import PlainTextResponse
+
+    from app.api.routes import router as api_router
+    from app.core.cache import todo_cache
+    from app.core.config import get_settings
+    from app.core.handlers import register_handlers
+    from app.core.lifecycle import lifespan
+    from app.core.metrics import render as render_metrics
+    from app.core.middlewares import register_middlewares
+
     settings = get_settings()
     app = FastAPI(
         title=settings.APP_NAME,
@@ -30,11 +39,23 @@ def create_app() -> FastAPI:
             "host": settings.HOST,
             "port": settings.PORT,
             "docs": app.docs_url,
+            "cache": todo_cache.stats(),
         }
 
+    if settings.METRICS_ENABLED:
+
+        @app.get("/metrics", tags=["root"], response_class=PlainTextResponse)
+        async def read_metrics():
+            return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     app.include_router(api_router, prefix=settings.API_PREFIX)
 
     return app
 
 
-app = create_app()
+def __getattr__(name: str):
+    # 应用实例在首次访问 app.app 时创建（uvicorn 以 "app:app" 加载）
+    if name == "app":
+        application = globals()["app"] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,46 @@
-from fastapi import APIRouter, Path
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from itertools import batched
+from tempfile import SpooledTemporaryFile
+from time import monotonic, time
+from typing import Annotated, Any
+
+import ujson
+from fastapi import APIRouter, Body, Depends, Header, Path, Request, Response, WebSocket
 from fastapi.params import Query
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 
+from app.core.config import get_settings
+from app.core.database import async_session_factory, async_write_session_factory
+from app.core.etag import collection_etag, is_not_modified, todo_etag, validator_headers
+from app.core.events import change_feed
 from app.core.exception import BizException
-from app.core.handlers import success
+from app.core.handlers import fast_success, success
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.streaming import MEDIA_TYPES, LineTooLong, StreamFormat, decode_stream, encode_sse, encode_stream
 from app.crud import todo_crud
-from app.deps import session_dep
-from app.schemas import BaseResponse, PageResult, Todo, TodoCreate, TodoUpdate
+from app.deps import session_dep, writer_dep
+from app.schemas import (
+    BaseResponse,
+    BatchItemResult,
+    DbInt,
+    DeltaResult,
+    ImportResult,
+    ImportRowError,
+    PageResult,
+    Todo,
+    TodoBatchUpdate,
+    TodoCreate,
+    TodoFilter,
+    TodoStats,
+    TodoUpdate,
+)
+
+settings = get_settings()
 
 router = APIRouter()
 
@@ -16,17 +51,409 @@ router = APIRouter()
     summary="创建新的 Todo 项",
     description="创建一个新的 Todo 任务并返回创建结果",
 )
-async def create_todo(session: session_dep, todo_in: TodoCreate):
+async def create_todo(writer: writer_dep, todo_in: TodoCreate):
     """
     创建新的 Todo 项
 
-    - **session**: 数据库会话（自动注入）
+    - **writer**: 写操作执行器（自动注入）
     - **todo_in**: Todo 创建数据模型
     """
-    todo = await todo_crud.create(session, todo_in=todo_in)
+    todo = await writer.run(todo_crud.create, todo_in=todo_in)
     return success(code=201, data=todo)
 
 
+@router.post(
+    "/batch",
+    response_model=BaseResponse[list[BatchItemResult[Todo]]],
+    summary="批量创建 Todo 项",
+    description="在同一事务内批量创建 Todo 任务，按输入顺序返回每一项的创建结果",
+)
+async def create_todos(
+    writer: writer_dep,
+    todos_in: Annotated[list[TodoCreate], Body(min_length=1, max_length=settings.BATCH_MAX_SIZE)],
+):
+    """
+    批量创建 Todo 项
+
+    - **writer**: 写操作执行器（自动注入）
+    - **todos_in**: Todo 创建数据模型列表
+    """
+    todos = await writer.run(todo_crud.create_many, todos_in=todos_in)
+    return success(code=201, data=[BatchItemResult(id=todo.id, code=201, data=todo) for todo in todos])
+
+
+@router.patch(
+    "/batch",
+    response_model=BaseResponse[list[BatchItemResult[Todo]]],
+    summary="批量更新 Todo 项",
+    description="在同一事务内批量更新 Todo 任务，按输入顺序返回每一项的更新结果",
+)
+async def update_todos(
+    writer: writer_dep,
+    todos_in: Annotated[list[TodoBatchUpdate], Body(min_length=1, max_length=settings.BATCH_MAX_SIZE)],
+):
+    """
+    批量更新 Todo 项
+
+    - **writer**: 写操作执行器（自动注入）
+    - **todos_in**: Todo 批量更新数据模型列表（每项需包含 id）
+
+    不存在的项返回 code=404，其余项正常更新
+    """
+    updated = await writer.run(todo_crud.update_many, todos_in=todos_in)
+    results = []
+    for todo_in in todos_in:
+        todo = updated.get(todo_in.id)
+        if todo is None:
+            results.append(BatchItemResult(id=todo_in.id, code=404, msg="Todo not found"))
+        else:
+            results.append(BatchItemResult(id=todo.id, data=todo))
+    return success(data=results)
+
+
+@router.delete(
+    "/batch",
+    response_model=BaseResponse[list[BatchItemResult[Todo]]],
+    summary="批量删除 Todo 项",
+    description="在同一事务内批量删除 Todo 任务，按输入顺序返回每一项的删除结果",
+)
+async def delete_todos(
+    writer: writer_dep,
+    ids: Annotated[list[DbInt], Body(embed=True, min_length=1, max_length=settings.BATCH_MAX_SIZE)],
+):
+    """
+    批量删除 Todo 项
+
+    - **writer**: 写操作执行器（自动注入）
+    - **ids**: 要删除的 Todo ID 列表
+
+    成功删除的项返回 code=204，不存在的项返回 code=404
+    """
+    deleted = await writer.run(todo_crud.delete_many, ids=ids)
+    results = [
+        BatchItemResult(id=todo_id, code=204)
+        if todo_id in deleted
+        else BatchItemResult(id=todo_id, code=404, msg="Todo not found")
+        for todo_id in ids
+    ]
+    return success(data=results)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="导出全部 Todo 项",
+    description="以 NDJSON 或 CSV 格式流式导出全部 Todo 任务，内存占用与数据量无关",
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+)
+async def export_todos(
+    fmt: StreamFormat = Query("ndjson", alias="format", title="导出格式", description="ndjson 或 csv"),
+):
+    """
+    流式导出全部 Todo 项
+
+    - **format**: 导出格式（默认 ndjson）
+
+    数据库会话在响应流内部创建，随响应结束关闭
+    """
+
+    async def batches() -> AsyncIterator[list[dict[str, Any]]]:
+        async with async_session_factory() as session, session.begin():
+            async for batch in todo_crud.iter_batches(session, batch_size=settings.EXPORT_BATCH_SIZE):
+                yield batch
+
+    return StreamingResponse(
+        encode_stream(batches(), fmt, fieldnames=list(Todo.model_fields)),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="todos.{fmt}"'},
+    )
+
+
+@router.post(
+    "/import",
+    response_model=BaseResponse[ImportResult],
+    summary="批量导入 Todo 项",
+    description="从 NDJSON 或 CSV 请求体流式导入 Todo 任务，分批写入并返回导入结果汇总",
+    openapi_extra={
+        "requestBody": {"required": True, "content": {media_type: {} for media_type in MEDIA_TYPES.values()}}
+    },
+)
+async def import_todos(
+    request: Request,
+    fmt: StreamFormat | None = Query(
+        None,
+        alias="format",
+        title="导入格式",
+        description="ndjson 或 csv，默认根据 Content-Type 判断",
+    ),
+    chunk_size: int = Query(
+        settings.IMPORT_CHUNK_SIZE,
+        ge=1,
+        le=10000,
+        title="批大小",
+        description="每批写入的记录数",
+    ),
+    atomic: bool = Query(
+        True,
+        title="是否整体提交",
+        description="为 true 时先读取并校验完整请求体，再在同一事务中写入，任一批次写入失败则全部回滚；"
+        "为 false 时边读取边写入，每批单独提交",
+    ),
+):
+    """
+    流式导入 Todo 项
+
+    - **format**: 导入格式（可选）
+    - **chunk_size**: 每批写入的记录数
+    - **atomic**: 是否整体提交（默认 true）
+
+    请求体按行增量解析，每条记录按 TodoCreate 校验，校验失败的记录计入 rejected 并返回行级错误，
+    其余记录按批以单条 executemany 语句写入。整体提交时已校验的记录先暂存（超过 IMPORT_SPOOL_MAX_SIZE 后转存临时文件），
+    请求体读取完毕后才开启写事务，写锁的占用时间与客户端上传速度无关；逐批提交时某批写入失败，
+    该批记录计入 rejected，其余批次照常提交，返回的汇总始终与实际提交的数据一致
+    """
+    if fmt is None:
+        fmt = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    result = ImportResult()
+
+    def reject(line: int, msg: str):
+        result.rejected += 1
+        if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+            result.errors.append(ImportRowError(line=line, msg=msg))
+
+    async def validated() -> AsyncIterator[tuple[int, TodoCreate]]:
+        records = decode_stream(request.stream(), fmt, max_line_bytes=settings.IMPORT_MAX_LINE_BYTES)
+        try:
+            async for record in records:
+                if record.error is not None:
+                    reject(record.line, record.error)
+                    continue
+                try:
+                    yield record.line, TodoCreate.model_validate(record.data)
+                except ValidationError as e:
+                    errors = e.errors()
+                    reject(record.line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in errors))
+        except LineTooLong as e:
+            committed = f"，此前的 {result.accepted} 条已提交" if result.accepted else ""
+            raise BizException(code=413, msg=f"{e}{committed}")
+
+    async def commit_chunk(chunk: list[tuple[int, TodoCreate]]):
+        """单独提交一批；写入失败时该批记录计入 rejected，已提交的批次不受影响，导入继续"""
+        try:
+            async with async_write_session_factory.begin() as session:
+                ids = await todo_crud.insert_many(session, todos_in=[todo for _, todo in chunk])
+        except SQLAlchemyError as e:
+            logger.error(f"导入批次写入失败（第 {chunk[0][0]}-{chunk[-1][0]} 行）: {str(e)}")
+            for line, _ in chunk:
+                reject(line, "写入失败")
+        else:
+            result.accepted += len(ids)
+
+    if not atomic:
+        chunk: list[tuple[int, TodoCreate]] = []
+        async for item in validated():
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                await commit_chunk(chunk)
+                chunk = []
+        if chunk:
+            await commit_chunk(chunk)
+        return success(code=201, data=result)
+
+    # 先完整读取并校验请求体，再以一个短事务写入，避免读取请求体期间一直占用写锁
+    with SpooledTemporaryFile(max_size=settings.IMPORT_SPOOL_MAX_SIZE) as spool:
+        async for _, todo in validated():
+            spool.write(ujson.dumps(todo.model_dump()).encode() + b"\n")
+        spool.seek(0)
+        try:
+            async with async_write_session_factory.begin() as session:
+                for lines in batched(spool, chunk_size):
+                    todos_in = [TodoCreate.model_construct(**ujson.loads(line)) for line in lines]
+                    result.accepted += len(await todo_crud.insert_many(session, todos_in=todos_in))
+        except SQLAlchemyError as e:
+            logger.error(f"导入失败（已全部回滚）: {str(e)}")
+            raise BizException(code=500, msg="服务器内部错误")
+    return success(code=201, data=result)
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    summary="订阅 Todo 变更事件",
+    description="以 Server-Sent Events 推送 Todo 的创建、更新、删除事件，替代轮询列表接口；"
+    "同一路径也接受 WebSocket 连接",
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def todo_events(
+    since: int | None = Query(
+        None,
+        ge=0,
+        title="起始序号",
+        description="只推送序号大于该值的事件，为空时只推送连接之后的新事件",
+    ),
+    last_event_id: int | None = Header(
+        None,
+        ge=0,
+        title="最后事件序号",
+        description="断线重连时浏览器自动携带，优先于 since",
+    ),
+):
+    """
+    订阅 Todo 变更事件（SSE）
+
+    - **since**: 起始序号（可选）
+    - **Last-Event-ID**: 断线重连时的最后事件序号（可选）
+
+    每条消息的 data 为 JSON 对象：seq（序号）、op（created / updated / deleted / archived / reset）、id（Todo ID）、
+    ts（变更时间）、data（Todo 当前数据，已删除或已归档时为 null）。收到 reset 时表示所需的变更已不可追溯，
+    客户端应重新加载列表。空闲时定期发送注释行作为心跳，连接达到最长持续时间后由服务端关闭，
+    浏览器会携带 Last-Event-ID 自动重连
+    """
+    if last_event_id is not None:
+        since = last_event_id
+    if since is None:
+        since = change_feed.last_seq
+
+    async def stream() -> AsyncIterator[bytes]:
+        # 先下发起始序号，保证在没有任何事件时重连也能从断开处恢复
+        yield f"retry: 3000\nid: {since}\n\n".encode()
+        deadline = monotonic() + settings.CHANGE_FEED_MAX_AGE
+        async with aclosing(change_feed.subscribe(since, heartbeat=settings.CHANGE_FEED_HEARTBEAT)) as events_iter:
+            async for events in events_iter:
+                yield encode_sse(events) if events else b": ping\n\n"
+                if monotonic() >= deadline:
+                    break
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/events")
+async def todo_events_ws(
+    websocket: WebSocket,
+    since: int | None = Query(None, ge=0, title="起始序号", description="只推送序号大于该值的事件"),
+):
+    """
+    订阅 Todo 变更事件（WebSocket）
+
+    - **since**: 起始序号（可选）
+
+    每条文本消息为一批变更事件组成的 JSON 数组，事件格式与 SSE 接口相同
+    """
+    await websocket.accept()
+
+    async def drain():
+        """客户端不发送业务消息，收到的消息（如应用层心跳）直接丢弃，只需感知连接关闭"""
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    async def push():
+        async with aclosing(change_feed.subscribe(since, heartbeat=settings.CHANGE_FEED_HEARTBEAT)) as events_iter:
+            async for events in events_iter:
+                if events:
+                    await websocket.send_json(events)
+
+    # 连接关闭（或推送结束）时立即结束另一方，不必等到下一批事件或心跳
+    tasks = {asyncio.create_task(drain()), asyncio.create_task(push())}
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.get(
+    "/changes",
+    response_model=BaseResponse[DeltaResult[Todo]],
+    summary="增量同步 Todo 项",
+    description="返回同步令牌之后创建或更新的 Todo 与被删除的 Todo ID，代价与变更量成正比",
+)
+async def read_todo_changes(
+    session: session_dep,
+    since: int | None = Query(
+        None,
+        ge=0,
+        title="同步令牌",
+        description="上次同步返回的 next_since；传 0 从头同步，为空时只返回当前令牌",
+    ),
+    limit: int = Query(1000, ge=1, le=5000, title="变更条数上限", description="单次读取的最大变更日志条数"),
+):
+    """
+    增量同步 Todo 项
+
+    - **session**: 数据库会话（自动注入）
+    - **since**: 同步令牌（可选）
+    - **limit**: 单次读取的最大变更日志条数（默认 1000）
+
+    令牌即变更序号，与变更推送接口的事件序号一致，已归档的 Todo 与已删除的一样出现在 deleted 中。
+    has_more 为 true 时应以 next_since 继续请求；
+    令牌过期（所需变更日志已被清理）时返回 code=410，客户端应先不带 since 获取当前令牌，
+    再通过列表接口全量同步，之后从该令牌继续增量同步
+    """
+    delta = await todo_crud.get_delta(session, since=since, limit=limit)
+    if settings.FAST_JSON_RESPONSE:
+        return fast_success(data=delta)
+    return success(data=DeltaResult[Todo](**delta))
+
+
+@router.get(
+    "/stats",
+    response_model=BaseResponse[TodoStats],
+    summary="获取 Todo 统计数据",
+    description="返回 Todo 总数、已完成数、未完成数与逾期数，读取随写操作维护的计数器，代价与数据量无关",
+)
+async def read_todo_stats(session: session_dep):
+    """
+    获取 Todo 统计数据
+
+    - **session**: 数据库会话（自动注入）
+    """
+    stats = await todo_crud.get_stats(session)
+    if settings.FAST_JSON_RESPONSE:
+        return fast_success(data=stats)
+    return success(data=TodoStats(**stats))
+
+
+@router.get(
+    "/due",
+    response_model=BaseResponse[PageResult[Todo]],
+    summary="获取到期的 Todo 列表",
+    description="按截止时间升序返回截止时间不晚于 before 的未完成 Todo，使用游标分页",
+)
+async def read_due_todos(
+    session: session_dep,
+    before: int | None = Query(None, title="截止时间上限", description="时间戳（含），为空时取当前时间"),
+    size: int = Query(10, ge=1, le=100, title="每页大小", description="每页返回的记录数（1-100）", example=10),
+    cursor: str | None = Query(None, title="分页游标", description="上一页返回的 next_cursor"),
+):
+    """
+    获取到期的 Todo 列表
+
+    - **session**: 数据库会话（自动注入）
+    - **before**: 截止时间上限（默认当前时间）
+    - **size**: 每页记录数（默认10，最大100）
+    - **cursor**: 分页游标（可选）
+
+    只查询未完成 Todo 的部分索引，代价与已完成的数据量无关；结果不缓存
+    """
+    if before is None:
+        before = int(time())
+    after = decode_cursor(cursor, sort="deadline:due") if cursor else None
+    items = await todo_crud.get_pending(session, before=before, after=after, limit=size + 1)
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor("deadline:due", items[-1]["deadline"], items[-1]["id"])
+    page_result = {"total": None, "page": None, "size": size, "items": items, "next_cursor": next_cursor}
+    if settings.FAST_JSON_RESPONSE:
+        return fast_success(data=page_result)
+    return success(data=PageResult(**page_result))
+
+
 @router.get(
     "/{todo_id}",
     response_model=BaseResponse[Todo],
@@ -34,6 +461,8 @@ async def create_todo(session: session_dep, todo_in: TodoCreate):
     description="根据 ID 获取指定的 Todo 任务",
 )
 async def read_todo(
+    request: Request,
+    response: Response,
     session: session_dep,
     todo_id: int = Path(
         ...,
@@ -47,8 +476,16 @@ async def read_todo(
 
     - **session**: 数据库会话（自动注入）
     - **todo_id**: 要查询的 Todo ID
+
+    支持 If-None-Match / If-Modified-Since 条件请求，未修改时直接返回 304
     """
     todo = await todo_crud.get_or_404(session, todo_id=todo_id)
+    headers = validator_headers(todo_etag(todo), todo["updated_at"])
+    if is_not_modified(request, headers["ETag"], todo["updated_at"]):
+        return Response(status_code=304, headers=headers)
+    if settings.FAST_JSON_RESPONSE:
+        return fast_success(data=todo, headers=headers)
+    response.headers.update(headers)
     return success(data=todo)
 
 
@@ -56,12 +493,21 @@ async def read_todo(
     "/",
     response_model=BaseResponse[PageResult[Todo]],
     summary="获取分页的 Todo 列表",
-    description="获取分页的 Todo 任务列表，支持页码和每页大小参数",
+    description="获取分页的 Todo 任务列表，支持筛选、排序、全文搜索，以及页码分页和游标分页（传入 cursor 时忽略 page）",
 )
 async def read_todos(
+    request: Request,
+    response: Response,
     session: session_dep,
+    filters: Annotated[TodoFilter, Depends()],
     page: int = Query(1, ge=1, title="页码", description="要查询的页码（从1开始）", example=1),
     size: int = Query(10, ge=1, le=100, title="每页大小", description="每页返回的记录数（1-100）", example=10),
+    cursor: str | None = Query(
+        None,
+        title="分页游标",
+        description="上一页返回的 next_cursor，传入后使用游标分页，查询代价与页深无关",
+    ),
+    include_total: bool = Query(True, title="是否统计总数", description="为 false 时不返回 total，省去计数查询"),
 ):
     """
     获取分页的 Todo 列表
@@ -69,11 +515,36 @@ async def read_todos(
     - **session**: 数据库会话（自动注入）
     - **page**: 当前页码（默认1）
     - **size**: 每页记录数（默认10，最大100）
+    - **cursor**: 分页游标（可选，优先于 page）
+    - **include_total**: 是否返回总数（默认 true）
+    - **filters**: 筛选与排序参数（completed、deadline_from、deadline_to、q、sort、order、include_archived）
+
+    支持 If-None-Match 条件请求，集合未变化时直接返回 304
     """
+    etag = collection_etag(await todo_crud.collection_version(session))
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=validator_headers(etag))
+    cursor_sort = f"{filters.sort}:{filters.order}"
+    after = decode_cursor(cursor, sort=cursor_sort, nullable=filters.sort == "deadline") if cursor else None
     skip = (page - 1) * size
-    total = await todo_crud.count(session)
-    items = await todo_crud.get_multi(session, skip=skip, limit=size)
-    return success(data=PageResult(total=total, page=page, size=size, items=items))
+    total = await todo_crud.count(session, filters=filters) if include_total else None
+    # 多取一条用于判断是否还有下一页
+    items = await todo_crud.get_multi(session, skip=skip, limit=size + 1, after=after, filters=filters)
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(cursor_sort, items[-1][filters.sort], items[-1]["id"])
+    page_result = {
+        "total": total,
+        "page": None if cursor else page,
+        "size": size,
+        "items": items,
+        "next_cursor": next_cursor,
+    }
+    if settings.FAST_JSON_RESPONSE:
+        return fast_success(data=page_result, headers=validator_headers(etag))
+    response.headers.update(validator_headers(etag))
+    return success(data=PageResult(**page_result))
 
 
 @router.put(
@@ -83,18 +554,18 @@ async def read_todos(
     description="更新指定 ID 的 Todo 任务",
 )
 async def update_todo(
-    session: session_dep,
+    writer: writer_dep,
     todo_in: TodoUpdate,
     todo_id: int = Path(..., title="Todo ID", description="要更新的 Todo 项ID", example=1),
 ):
     """
     更新指定的 Todo 项
 
-    - **session**: 数据库会话（自动注入）
+    - **writer**: 写操作执行器（自动注入）
     - **todo_id**: 要更新的 Todo ID
     - **todo_in**: Todo 更新数据模型
     """
-    updated = await todo_crud.update(session, todo_id=todo_id, todo_in=todo_in)
+    updated = await writer.run(todo_crud.update, todo_id=todo_id, todo_in=todo_in)
     return success(data=updated)
 
 
@@ -104,7 +575,7 @@ async def update_todo(
     description="删除指定 ID 的 Todo 任务",
 )
 async def delete_todo(
-    session: session_dep,
+    writer: writer_dep,
     todo_id: int = Path(
         ...,
         title="Todo ID",
@@ -115,12 +586,12 @@ async def delete_todo(
     """
     删除指定的 Todo 项
 
-    - **session**: 数据库会话（自动注入）
+    - **writer**: 写操作执行器（自动注入）
     - **todo_id**: 要删除的 Todo ID
 
     成功时返回 code=204（无内容），失败时返回 code=404 错误
     """
-    deleted = await todo_crud.delete(session, todo_id=todo_id)
+    deleted = await writer.run(todo_crud.delete, todo_id=todo_id)
     if not deleted:
         raise BizException(code=404, msg="Todo not found")
     return success(code=204)
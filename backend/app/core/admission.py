@@ -0,0 +1,86 @@
+import asyncio
+from time import perf_counter
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.exception import BizException
+from app.core.metrics import QUERY_BUCKETS, Counter, Gauge, Histogram, register_collector
+
+settings = get_settings()
+
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "已准入、正在持有数据库连接的请求数", ("engine",))
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "排队等待数据库连接的请求数", ("engine",))
+ADMISSION_LIMIT = Gauge("admission_limit", "同时准入的请求数上限（连接池容量）", ("engine",))
+ADMISSION_WAIT = Histogram("admission_wait_seconds", "排队等待准入的耗时(秒)", ("engine",), QUERY_BUCKETS)
+ADMISSION_REJECTED = Counter("admission_rejected_total", "被拒绝的请求数", ("engine", "reason"))
+
+
+class AdmissionLimiter:
+    """准入控制（限制同时持有某个连接池连接的请求数）
+
+    上限为连接池最多可借出的连接数：未达上限时直接准入；达到上限后在有界队列中
+    按先来先到排队，最多等待 timeout 秒；队列已满或等待超时时立即以 503 拒绝并返回 Retry-After，
+    避免请求堆积在连接池上等待 DB_POOL_TIMEOUT 后才失败。
+    在借出连接时获取名额（而不是在请求开始时），命中缓存或共享合并查询结果的请求不占用名额
+    """
+
+    def __init__(self, name: str, *, limit: int, max_queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+        _limiters[name] = self
+
+    async def acquire(self):
+        """获取准入名额，无法准入时抛出 code=503 的 BizException"""
+        if self._semaphore.locked():
+            await self._wait()
+        else:
+            await self._semaphore.acquire()  # 有空闲名额时不会挂起
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _wait(self):
+        if self.waiting >= self.max_queue:
+            self._reject("queue_full")
+        self.waiting += 1
+        started = perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self._reject("timeout")
+        finally:
+            self.waiting -= 1
+            ADMISSION_WAIT.observe(perf_counter() - started, self.name)
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.inc(self.name, reason)
+        logger.warning(f"请求过载被拒绝 [{self.name}] {reason}: 处理中 {self.in_flight}，排队 {self.waiting}")
+        raise BizException(
+            code=503,
+            msg="服务繁忙，请稍后重试",
+            status_code=503,
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+        )
+
+
+# 各连接池当前的准入控制（连接池重建时替换）
+_limiters: dict[str, AdmissionLimiter] = {}
+
+
+def _collect_admission_metrics():
+    for limiter in _limiters.values():
+        ADMISSION_IN_FLIGHT.set(limiter.in_flight, limiter.name)
+        ADMISSION_QUEUE_DEPTH.set(limiter.waiting, limiter.name)
+        ADMISSION_LIMIT.set(limiter.limit, limiter.name)
+
+
+register_collector(_collect_admission_metrics)
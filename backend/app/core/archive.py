@@ -0,0 +1,65 @@
+import asyncio
+from time import time
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.coordination import leader
+from app.core.database import async_write_session_factory
+from app.core.metrics import Counter
+from app.core.tasks import BackgroundTask
+
+settings = get_settings()
+
+ARCHIVED_TODOS = Counter("archived_todos_total", "移入归档表的 Todo 数")
+
+
+class Archiver(BackgroundTask):
+    """归档任务（多进程下只由主进程执行）
+
+    每隔 interval 秒将完成后超过 ARCHIVE_AFTER 秒未更新的 Todo 移入归档表，
+    每个事务最多移动 batch_size 条，批次之间让出事件循环，避免长时间占用写连接
+    """
+
+    name = "archiver"
+
+    def __init__(self, *, after: int, interval: float, batch_size: int):
+        super().__init__()
+        self._after = after
+        self._interval = interval
+        self._batch_size = batch_size
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            if not leader.is_leader:
+                continue
+            try:
+                await self.archive()
+            except Exception as e:
+                logger.error(f"归档 Todo 失败: {str(e)}")
+
+    async def archive(self) -> int:
+        """归档全部符合条件的 Todo，返回归档的条数"""
+        from app.crud import todo_crud
+
+        before = int(time()) - self._after
+        total = 0
+        while True:
+            async with async_write_session_factory.begin() as session:
+                archived = await todo_crud.archive(session, before=before, limit=self._batch_size)
+            total += archived
+            ARCHIVED_TODOS.inc(amount=archived)
+            if archived < self._batch_size:
+                break
+            await asyncio.sleep(0)
+        if total:
+            logger.info(f"已归档 {total} 条已完成的 Todo")
+        return total
+
+
+archiver = Archiver(
+    after=settings.ARCHIVE_AFTER,
+    interval=settings.ARCHIVE_INTERVAL,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+)
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from time import monotonic
+from typing import Any, Protocol
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import CACHE_EVICTIONS, CACHE_REQUESTS, register_collector
+
+settings = get_settings()
+
+
+class CacheBackend(Protocol):
+    """缓存后端
+
+    自定义后端通过配置项 CACHE_BACKEND 指定，以 max_size、ttl 关键字参数实例化
+    """
+
+    def get(self, key: str) -> Any | None: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryCache:
+    """进程内 LRU 缓存
+
+    条目数超过 max_size 时淘汰最久未使用的条目，条目写入超过 ttl 秒后失效
+    """
+
+    def __init__(self, *, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class TodoCache:
+    """Todo 读缓存
+
+    - 单个 Todo 按 ID 缓存，写操作提交后按 ID 失效
+    - 列表页（及总数）按查询参数缓存，键中包含集合版本号，任何写操作提交后版本号递增，旧版本的条目自然淘汰
+    - 写入缓存时校验读取所在事务开始时的版本号（见 begin_version），避免并发写操作提交后回填旧数据
+    """
+
+    def __init__(self, backend: CacheBackend, *, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Any | None:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_item(self, todo_id: int) -> dict[str, Any] | None:
+        return self._lookup(f"todo:{todo_id}") if self.enabled else None
+
+    def set_item(self, todo_id: int, data: dict[str, Any], version: int) -> None:
+        if self.enabled and version == self.version:
+            self.backend.set(f"todo:{todo_id}", data)
+
+    def get_page(self, key: Hashable) -> Any | None:
+        return self._lookup(f"page:{self.version}:{key}") if self.enabled else None
+
+    def set_page(self, key: Hashable, value: Any, version: int) -> None:
+        if self.enabled and version == self.version:
+            self.backend.set(f"page:{version}:{key}", value)
+
+    def invalidate(self, todo_ids: Iterable[int] = ()) -> None:
+        """使指定 Todo 及所有列表页缓存失效"""
+        self.version += 1
+        for todo_id in todo_ids:
+            self.backend.delete(f"todo:{todo_id}")
+
+    def stats(self) -> dict[str, int]:
+        """缓存命中、未命中与淘汰计数"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "version": self.version,
+        }
+
+
+_backend_class = settings.CACHE_BACKEND or MemoryCache
+todo_cache = TodoCache(
+    _backend_class(max_size=settings.CACHE_MAX_SIZE, ttl=settings.CACHE_TTL),
+    enabled=settings.CACHE_ENABLED,
+)
+
+
+# 会话信息中记录当前事务开始时缓存版本号的键
+_BEGIN_VERSION_KEY = "cache_version"
+
+
+def begin_version(session: AsyncSession | Session) -> int:
+    """读取所在事务开始时的缓存版本号（用于回填缓存）
+
+    事务读到的是开始之后某一时刻的快照，以此前记录的版本号回填：其间有写操作提交（版本号已递增）时放弃回填，
+    避免以新版本号缓存旧快照中的数据
+    """
+    return session.info.get(_BEGIN_VERSION_KEY, todo_cache.version)
+
+
+@event.listens_for(Session, "after_begin")
+def _record_begin_version(session: Session, transaction, connection):  # noqa: ARG001
+    session.info[_BEGIN_VERSION_KEY] = todo_cache.version
+
+
+def _collect_cache_metrics():
+    CACHE_REQUESTS.set(todo_cache.hits, "hit")
+    CACHE_REQUESTS.set(todo_cache.misses, "miss")
+    CACHE_EVICTIONS.set(getattr(todo_cache.backend, "evictions", 0))
+
+
+register_collector(_collect_cache_metrics)
@@ -0,0 +1,114 @@
+import asyncio
+import os
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy.engine import make_url
+
+from app.core.config import get_settings
+from app.core.tasks import BackgroundTask
+
+try:
+    import fcntl
+except ImportError:  # Windows 下不支持多进程模式，文件锁退化为空操作
+    fcntl = None
+
+settings = get_settings()
+
+
+def lock_path(name: str) -> Path:
+    """锁文件路径：SQLite 下与数据库文件放在一起，保证使用同一数据库的进程共享同一把锁"""
+    url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        database = Path(url.database)
+        return database.with_name(f"{database.name}.{name}.lock")
+    return settings.DATA_DIR / f"{name}.lock"
+
+
+class FileLock:
+    """跨进程互斥文件锁（flock），进程退出时由操作系统自动释放"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: int | None = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """获取锁，非阻塞模式下锁已被占用时返回 False"""
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+    async def __aenter__(self):
+        await asyncio.to_thread(self.acquire)  # 阻塞等待放到线程中，不阻塞事件循环
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class LeaderElection(BackgroundTask):
+    """基于文件锁的主进程选举
+
+    持有锁的工作进程为主进程，负责执行全局唯一的后台任务（如清理变更日志）；
+    其余进程定期重试获取锁，主进程退出后由其中一个接任
+    """
+
+    name = "leader-election"
+
+    def __init__(self, path: Path, *, retry_interval: float):
+        super().__init__()
+        self._lock = FileLock(path)
+        self._retry_interval = retry_interval
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock.locked
+
+    def try_acquire(self) -> bool:
+        """尝试成为主进程"""
+        if not self.is_leader and self._lock.acquire(blocking=False):
+            logger.info(f"工作进程 {os.getpid()} 成为主进程")
+        return self.is_leader
+
+    async def start(self):
+        """启动后台任务：非主进程定期重试获取锁"""
+        self.try_acquire()
+        await super().start()
+
+    async def stop(self):
+        await super().stop()
+        self._lock.release()
+
+    async def _run(self):
+        while not self.is_leader:
+            await asyncio.sleep(self._retry_interval)
+            self.try_acquire()
+
+
+leader = LeaderElection(lock_path("leader"), retry_interval=settings.LEADER_RETRY_INTERVAL)
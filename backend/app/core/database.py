@@ -1,27 +1,212 @@
+from collections.abc import Callable
+from time import perf_counter
+
 import ujson
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool
+from sqlalchemy.util import await_only
 
+from app.core.admission import AdmissionLimiter
 from app.core.config import get_settings
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_WAIT,
+    instrument_engine,
+    register_collector,
+)
+from app.core.profiling import instrument_slow_queries
 
 settings = get_settings()
 
-async_engine = create_async_engine(
-    url=settings.SQLALCHEMY_DATABASE_URI,
+DB_BACKEND = make_url(settings.SQLALCHEMY_DATABASE_URI).get_backend_name()
+if DB_BACKEND not in ("sqlite", "postgresql"):
+    raise RuntimeError(f"不支持的数据库: {DB_BACKEND}（仅支持 SQLite 与 PostgreSQL）")
+IS_SQLITE = DB_BACKEND == "sqlite"
+IS_POSTGRESQL = DB_BACKEND == "postgresql"
+# 整数列（ID 与时间戳）的取值范围：PostgreSQL 的 INTEGER 为 32 位，SQLite 的 INTEGER 最大为 64 位
+INT_MIN, INT_MAX = (-(2**31), 2**31 - 1) if IS_POSTGRESQL else (-(2**63), 2**63 - 1)
+
+
+def _sqlite_pragmas(query_only: bool = False) -> list[str]:
+    """根据配置生成 SQLite 性能相关的 PRAGMA 语句"""
+    pragmas = [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",  # WAL 模式下读写互不阻塞
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",  # WAL 模式下 NORMAL 已足够安全
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+        f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}",
+    ]
+    if query_only:
+        pragmas.append("PRAGMA query_only=ON")  # 读连接禁止写入，防止写操作误走读引擎
+    return pragmas
+
+
+def _connect_args(name: str, query_only: bool = False) -> dict:
+    """按数据库类型生成驱动连接参数"""
+    if IS_SQLITE:
+        return {"check_same_thread": False}  # 允许多线程访问
+    server_settings = {
+        "application_name": f"{settings.APP_NAME}:{name}",
+        "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT),  # 超时的语句由服务端取消
+    }
+    if query_only:
+        server_settings["default_transaction_read_only"] = "on"  # 读连接禁止写入，防止写操作误走读引擎
+    return {
+        "server_settings": server_settings,
+        # SQLAlchemy 为每个连接维护的预编译语句缓存，重复执行的语句跳过服务端解析与规划
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,  # asyncpg 自身的语句缓存
+    }
+
+
+class AdmittedQueuePool(AsyncAdaptedQueuePool):
+    """借出连接前经过准入控制、并记录获取连接等待耗时的连接池（按 pool_logging_name 区分引擎）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = (
+            AdmissionLimiter(
+                self.logging_name or "default",
+                limit=self.size() + self._max_overflow,
+                max_queue=settings.ADMISSION_QUEUE_SIZE,
+                timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+            )
+            if settings.ADMISSION_ENABLED and self._max_overflow >= 0  # 不限制临时连接数时无上限可言
+            else None
+        )
+
+    def connect(self):
+        if not settings.METRICS_ENABLED:
+            return super().connect()
+        started = perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_WAIT.observe(perf_counter() - started, self.logging_name or "default")
+
+    def _do_get(self):
+        if self.limiter is None:
+            return super()._do_get()
+        await_only(self.limiter.acquire())  # 连接池已满时在准入队列中等待，而不是在连接池上等待
+        try:
+            return super()._do_get()
+        except BaseException:
+            self.limiter.release()
+            raise
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            if self.limiter is not None:
+                self.limiter.release()
+
+
+def _create_engine(
+    name: str,
+    *,
+    query_only: bool = False,
+    begin: str = "BEGIN",
+    poolclass: type[Pool] = AdmittedQueuePool,
+    **pool_kwargs,
+) -> AsyncEngine:
+    """创建异步引擎
+
+    SQLite 下在每个连接建立时应用 PRAGMA，并由 SQLAlchemy 显式发出 BEGIN，
+    替代驱动自身的隐式事务管理，使 SAVEPOINT 可用；
+    PostgreSQL 下通过连接参数设置语句超时、只读事务与预编译语句缓存
+    """
+    engine = create_async_engine(
+        url=settings.SQLALCHEMY_DATABASE_URI,
+        poolclass=poolclass,
+        pool_logging_name=name,
+        **pool_kwargs,
+        # 日志与调试
+        echo=False,  # 是否输出 SQL 日志
+        echo_pool=False,  # 是否记录连接池事件
+        # 性能优化
+        json_serializer=ujson.dumps,  # ujson 序列化
+        json_deserializer=ujson.loads,  # ujson 反序列化
+        connect_args=_connect_args(name, query_only=query_only),
+    )
+    if settings.METRICS_ENABLED:
+        instrument_engine(engine.sync_engine, name)
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+        instrument_slow_queries(engine.sync_engine, name)
+    if IS_SQLITE:
+        pragmas = _sqlite_pragmas(query_only=query_only)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):  # noqa: ARG001
+            dbapi_connection.isolation_level = None  # 关闭驱动的隐式事务
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+        @event.listens_for(engine.sync_engine, "begin")
+        def emit_begin(conn):
+            conn.exec_driver_sql(begin)
+
+    return engine
+
+
+def _per_worker(total: int, minimum: int = 0) -> int:
+    """将所有工作进程合计的连接配额平均分配给每个进程（向上取整）"""
+    return max(minimum, -(-total // max(1, settings.WORKERS)))
+
+
+def create_dedicated_engine(name: str) -> AsyncEngine:
+    """创建不使用连接池的只读引擎，供长期占用一个连接的后台任务使用，不占用读连接池与准入配额（用后需 dispose）"""
+    return _create_engine(name, query_only=True, poolclass=NullPool)
+
+
+# 读引擎：连接池，处理所有只读请求
+async_engine = _create_engine(
+    "reader",
+    query_only=settings.DB_SPLIT_READ_WRITE,
     # 连接池配置
-    pool_size=10,  # 核心连接池大小
-    max_overflow=20,  # 超出 pool_size 时允许创建的临时连接数
-    pool_timeout=30,  # 获取连接等待超时(秒)
+    pool_size=_per_worker(settings.DB_POOL_SIZE, minimum=1),  # 本进程的核心连接池大小
+    max_overflow=_per_worker(settings.DB_MAX_OVERFLOW),  # 超出 pool_size 时允许创建的临时连接数
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # 获取连接等待超时(秒)
     pool_recycle=1800,  # 连接自动回收周期(秒)
-    pool_pre_ping=True,  # 执行前自动测试连接有效性
-    # 日志与调试
-    echo=False,  # 是否输出 SQL 日志
-    echo_pool=False,  # 是否记录连接池事件
-    # 性能优化
-    json_serializer=ujson.dumps,  # ujson 序列化
-    json_deserializer=ujson.loads,  # ujson 反序列化
-    connect_args={"check_same_thread": False},  # 允许多线程访问
+    pool_pre_ping=not IS_SQLITE,  # 本地文件数据库无需执行前测试连接
+)
+
+# 写引擎：SQLite 同一时刻只允许一个写事务，使用单连接避免进程内写锁竞争；服务端数据库使用独立的写连接池
+async_write_engine = (
+    _create_engine(
+        "writer",
+        begin="BEGIN IMMEDIATE",  # 事务开始即获取写锁，避免读锁升级写锁时的冲突
+        pool_size=1 if IS_SQLITE else _per_worker(settings.DB_WRITE_POOL_SIZE, minimum=1),
+        max_overflow=0,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=1800,
+        pool_pre_ping=not IS_SQLITE,
+    )
+    if settings.DB_SPLIT_READ_WRITE
+    else async_engine
 )
 
+
+def _collect_pool_metrics():
+    for name, engine in {"reader": async_engine, "writer": async_write_engine}.items():
+        pool = engine.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            DB_POOL_SIZE.set(pool.size(), name)
+            DB_POOL_CHECKED_OUT.set(pool.checkedout(), name)
+            DB_POOL_OVERFLOW.set(pool.overflow(), name)
+
+
+register_collector(_collect_pool_metrics)
+
 async_session_factory = async_sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
@@ -29,3 +214,43 @@ async_session_factory = async_sessionmaker(
     autoflush=False,  # 禁用自动 flush
     future=True,  # 显示指定使用 SQLAlchemy 2.0 API
 )
+
+async_write_session_factory = async_sessionmaker(
+    bind=async_write_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    future=True,
+)
+
+
+# 事务提交后回调
+# 写操作在事务内登记回调（如缓存失效），仅在最外层事务成功提交后执行，回滚时丢弃
+_AFTER_COMMIT_KEY = "after_commit_callbacks"
+
+
+def on_commit(session: AsyncSession | Session, callback: Callable[[], None]) -> None:
+    """登记在当前事务成功提交后执行的回调"""
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+def has_uncommitted_writes(session: AsyncSession | Session) -> bool:
+    """当前事务中是否存在尚未提交的写操作"""
+    return bool(session.info.get(_AFTER_COMMIT_KEY))
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session):
+    if session.get_nested_transaction() is not None:  # SAVEPOINT 释放，外层事务尚未提交
+        return
+    for callback in session.info.pop(_AFTER_COMMIT_KEY, []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"事务提交后回调执行失败: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session: Session):
+    if session.get_nested_transaction() is None:
+        session.info.pop(_AFTER_COMMIT_KEY, None)
@@ -0,0 +1,47 @@
+import hashlib
+from collections.abc import Mapping
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any
+
+import ujson
+from fastapi import Request
+
+
+def todo_etag(todo: Mapping[str, Any]) -> str:
+    """单个 Todo 的强 ETag，由 ID 与全部字段的摘要生成
+
+    更新时间只精确到秒，同一秒内的再次修改不会改变更新时间，因此不能以更新时间作为强校验值
+    """
+    digest = hashlib.blake2b(ujson.dumps(todo, sort_keys=True).encode(), digest_size=8).hexdigest()
+    return f'"{todo["id"]}-{digest}"'
+
+
+def collection_etag(version: int) -> str:
+    """Todo 列表的强 ETag，由集合版本号生成（任何写操作都会使版本号递增）"""
+    return f'"v{version}"'
+
+
+def validator_headers(etag: str, last_modified: int | None = None) -> dict[str, str]:
+    """生成缓存校验响应头"""
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: int | None = None) -> bool:
+    """根据 If-None-Match / If-Modified-Since 判断客户端缓存是否仍然有效
+
+    同时存在时以 If-None-Match 为准（RFC 9110 13.2.2）
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
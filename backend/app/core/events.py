@@ -0,0 +1,225 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from time import time
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import text
+
+from app.core.cache import todo_cache
+from app.core.config import get_settings
+from app.core.coordination import leader
+from app.core.database import (
+    IS_SQLITE,
+    async_session_factory,
+    async_write_session_factory,
+    create_dedicated_engine,
+)
+from app.core.metrics import CHANGE_FEED_SUBSCRIBERS, register_collector
+
+settings = get_settings()
+
+# 单次从变更日志读取的最大条数
+CHANGE_BATCH_SIZE = 500
+# 单次清理的最大日志条数
+PRUNE_BATCH_SIZE = 5000
+
+
+class ChangeFeed:
+    """Todo 变更事件总线
+
+    - 写操作在事务内追加变更日志（todo_changes），提交后调用 notify 唤醒后台拉取任务
+    - 拉取任务按序号读取已提交的新日志，追加到内存环形缓冲区，并唤醒所有订阅者
+    - 订阅者共享同一个 asyncio.Event 等待新事件，空闲订阅者只占用一个挂起的协程，
+      发布代价与订阅者数量无关（不为每个订阅者维护队列）
+    - 订阅者从任意序号恢复：缓冲区内的直接返回，更早的回退到变更日志查询，
+      日志已被清理时返回 reset 事件，提示客户端全量刷新
+    - 多进程模式下变更日志同时作为进程间的失效通道：检测到其他进程提交后立即拉取，
+      并按拉取到的事件失效本进程的读缓存；日志清理只由主进程执行
+    """
+
+    def __init__(self, *, buffer_size: int, poll_interval: float):
+        self.last_seq = 0
+        self.subscribers = 0
+        self._buffer: deque[dict[str, Any]] = deque(maxlen=buffer_size)
+        self._poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._published = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._closed = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def notify(self):
+        """通知有新的变更已提交（由写事务的提交回调调用）"""
+        self._wakeup.set()
+
+    async def start(self):
+        """启动后台拉取与日志清理任务"""
+        from app.crud import todo_crud
+
+        if self.running:
+            return
+        async with async_session_factory() as session:
+            _, self.last_seq = await todo_crud.change_seq_range(session)
+        self._buffer.clear()
+        self._closed = False
+        self._tasks = [
+            asyncio.create_task(self._pump(), name="change-feed-pump"),
+            asyncio.create_task(self._prune(), name="change-feed-prune"),
+        ]
+        if settings.WORKERS > 1 and IS_SQLITE:
+            self._tasks.append(asyncio.create_task(self._watch(), name="change-feed-watch"))
+
+    async def stop(self):
+        """停止后台任务，并结束所有订阅"""
+        self._closed = True
+        self._publish()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def subscribe(self, since: int | None = None, *, heartbeat: float) -> AsyncIterator[list[dict[str, Any]]]:
+        """订阅变更事件
+
+        Args:
+            since: 起始序号（不含），为空时只接收订阅之后的新事件
+            heartbeat: 空闲超时（秒），超时未有新事件时产出空列表，便于调用方发送心跳
+
+        Yields:
+            按序号升序排列的一批变更事件
+        """
+        cursor = self.last_seq if since is None else since
+        self.subscribers += 1
+        try:
+            while not self._closed:
+                waiter = self._published  # 先取等待对象再读事件，避免错过两者之间发布的事件
+                events = await self._events_after(cursor)
+                if events:
+                    cursor = events[-1]["seq"]
+                    yield events
+                    continue
+                try:
+                    await asyncio.wait_for(waiter.wait(), heartbeat)
+                except TimeoutError:
+                    yield []
+        finally:
+            self.subscribers -= 1
+
+    async def _events_after(self, cursor: int) -> list[dict[str, Any]]:
+        """读取序号 cursor 之后的事件"""
+        from app.crud import todo_crud
+
+        if cursor == self.last_seq:
+            return []
+        if cursor > self.last_seq:  # 序号来自重建前的数据库
+            return [self._reset_event()]
+        if self._buffer and self._buffer[0]["seq"] <= cursor + 1:
+            events = []
+            for event in reversed(self._buffer):  # 新事件位于缓冲区尾部
+                if event["seq"] <= cursor:
+                    break
+                events.append(event)
+            events.reverse()
+            return events
+        async with async_session_factory() as session:
+            first_seq, _ = await todo_crud.change_seq_range(session)
+            if first_seq > cursor + 1:  # 所需的日志已被清理
+                return [self._reset_event()]
+            events = await todo_crud.get_changes(session, after_seq=cursor, limit=CHANGE_BATCH_SIZE)
+        return [event for event in events if event["seq"] <= self.last_seq]
+
+    def _reset_event(self) -> dict[str, Any]:
+        return {"seq": self.last_seq, "op": "reset", "id": None, "ts": int(time()), "data": None}
+
+    def _publish(self):
+        """唤醒当前所有订阅者"""
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    async def _pump(self):
+        """拉取已提交的变更日志并发布；除提交通知外按 poll_interval 定期检查，兜底其他进程的写入"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._pull()
+            except Exception as e:
+                logger.error(f"拉取变更日志失败: {str(e)}")
+
+    async def _pull(self):
+        from app.crud import todo_crud
+
+        while True:
+            async with async_session_factory() as session:
+                events = await todo_crud.get_changes(session, after_seq=self.last_seq, limit=CHANGE_BATCH_SIZE)
+            if not events:
+                return
+            if settings.WORKERS > 1:  # 事件可能来自其他进程的写入，本进程的缓存未被失效
+                todo_cache.invalidate({event["id"] for event in events})
+            self._buffer.extend(events)
+            self.last_seq = events[-1]["seq"]
+            self._publish()
+            if len(events) < CHANGE_BATCH_SIZE:
+                return
+
+    async def _watch(self):
+        """轮询 PRAGMA data_version 检测其他连接（进程）提交的写事务，检测到后立即唤醒拉取任务
+
+        data_version 只在其他连接提交后改变，每次读取后结束事务，避免停留在旧快照上。
+        轮询连接长期占用，使用独立的引擎建立，不占用读连接池
+        """
+        interval = settings.CROSS_PROCESS_POLL_INTERVAL_MS / 1000
+        engine = create_dedicated_engine("watcher")
+        try:
+            while True:
+                try:
+                    async with engine.connect() as conn:
+                        last = await conn.scalar(text("PRAGMA data_version"))
+                        await conn.rollback()
+                        while True:
+                            await asyncio.sleep(interval)
+                            current = await conn.scalar(text("PRAGMA data_version"))
+                            await conn.rollback()
+                            if current != last:
+                                last = current
+                                self.notify()
+                except Exception as e:
+                    logger.error(f"检测跨进程写入失败: {str(e)}")
+                    await asyncio.sleep(self._poll_interval)
+        finally:
+            await engine.dispose()
+
+    async def _prune(self):
+        """定期清理超过保留期限的变更日志"""
+        from app.crud import todo_crud
+
+        while True:
+            await asyncio.sleep(settings.CHANGE_LOG_PRUNE_INTERVAL)
+            if not leader.is_leader:  # 多进程下只由主进程清理
+                continue
+            try:
+                before = int(time()) - settings.CHANGE_LOG_RETENTION
+                while True:
+                    async with async_write_session_factory.begin() as session:
+                        deleted = await todo_crud.prune_changes(session, before=before, limit=PRUNE_BATCH_SIZE)
+                    if deleted:
+                        logger.info(f"已清理 {deleted} 条过期变更日志")
+                    if deleted < PRUNE_BATCH_SIZE:
+                        break
+            except Exception as e:
+                logger.error(f"清理变更日志失败: {str(e)}")
+
+
+change_feed = ChangeFeed(
+    buffer_size=settings.CHANGE_FEED_BUFFER_SIZE,
+    poll_interval=settings.CHANGE_FEED_POLL_INTERVAL,
+)
+register_collector(lambda: CHANGE_FEED_SUBSCRIBERS.set(change_feed.subscribers))
@@ -5,11 +5,19 @@ from fastapi.openapi.utils import validation_error_definition, validation_error_
 class BizException(HTTPException):
     """业务错误
 
-    统一覆盖 HTTP Status Code 为 200
+    默认统一覆盖 HTTP Status Code 为 200；需要客户端或代理按状态码处理的错误（如 503 过载）
+    可通过 status_code 与 headers 指定实际的状态码与响应头，响应体仍为统一的 code/msg 结构
     """
 
-    def __init__(self, code: int = 400, msg: str = "业务错误"):
-        super().__init__(status_code=200)
+    def __init__(
+        self,
+        code: int = 400,
+        msg: str = "业务错误",
+        *,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+    ):
+        super().__init__(status_code=status_code, headers=headers)
         self.code = code
         self.msg = msg
 
@@ -1,6 +1,8 @@
+from collections.abc import Mapping
 from typing import Any
 
-from fastapi import FastAPI, Request
+import ujson
+from fastapi import FastAPI, Request, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from loguru import logger
@@ -14,6 +16,25 @@ def success(code: int = 200, msg: str = "success", data: Any = None) -> BaseResp
     return BaseResponse(code=code, msg=msg, data=data)
 
 
+def fast_success(
+    code: int = 200,
+    msg: str = "success",
+    data: Any = None,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """快速成功响应
+
+    跳过 BaseResponse 构建与 FastAPI 的响应模型校验，直接用 ujson 序列化为 JSON 字节。
+    data 必须已是与响应模型结构一致的 JSON 原生数据（dict、list 等），输出与 success() 完全一致
+    """
+    content = ujson.dumps(
+        {"code": code, "msg": msg, "data": data},
+        ensure_ascii=False,
+        escape_forward_slashes=False,
+    )
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
 def failed(code: int = 400, msg: str = "failed", data: Any = None) -> BaseResponse:
     return BaseResponse(code=code, msg=msg, data=data)
 
@@ -24,7 +45,11 @@ def register_handlers(app: FastAPI):
         request: Request,  # noqa: ARG001
         exc: BizException,
     ):
-        return JSONResponse(status_code=200, content=failed(code=exc.code, msg=exc.msg).model_dump())
+        return JSONResponse(
+            status_code=exc.status_code,
+            content=failed(code=exc.code, msg=exc.msg).model_dump(),
+            headers=exc.headers,
+        )
 
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(
@@ -1,12 +1,23 @@
-from contextlib import asynccontextmanager
+import zlib
+from collections.abc import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from time import perf_counter
 
 from fastapi import FastAPI
 from loguru import logger
-from sqlalchemy import text
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateIndex, CreateTable
 from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
+from app.core.archive import archiver
 from app.core.config import get_settings
-from app.core.database import async_engine
+from app.core.coordination import FileLock, leader, lock_path
+from app.core.database import IS_SQLITE, async_engine, async_write_engine, async_write_session_factory
+from app.core.events import change_feed
+from app.core.scheduler import due_scheduler
+from app.core.stats import stats_maintainer
+from app.core.writer import write_coalescer
 
 settings = get_settings()
 
@@ -25,28 +36,121 @@ async def db_connect():
         logger.info("数据库连接成功!")
 
 
-async def db_init(force_drop: bool = False):
+async def db_init(force_drop: bool = False) -> bool:
     """数据库初始化
 
     - force_drop: 是否强制删除重建（生产环境下不允许强制删除）
+
+    根据模型生成架构版本号并记录在数据库中（SQLite 为 PRAGMA user_version），版本一致时跳过建表与计数器校准。
+    版本检查与建表在同一个写事务中完成（SQLite 下为 BEGIN IMMEDIATE），多个进程同时启动时只有一个进程执行建表，
+    其余进程等待其提交后读到最新版本直接跳过。建表只创建缺失的表与索引，不修改已有的表结构
+
+    Returns:
+        是否执行了建表
     """
-    from app import models  # noqa: F401
+    from app.crud import todo_crud
     from app.models import Base
 
+    if force_drop and settings.APP_ENV == "production":
+        raise RuntimeError("生产环境禁止强制删除数据库表")
     logger.info("数据库初始化...")
     try:
-        async with async_engine.begin() as conn:
+        version = _schema_version()
+        async with async_write_engine.begin() as conn:
+            if not force_drop and await _read_schema_version(conn) == version:
+                logger.info("数据库架构已是最新，跳过建表")
+                return False
             if force_drop:
                 logger.info("删除旧表...")
                 await conn.run_sync(Base.metadata.drop_all)
                 logger.info("已强制删除旧表!")
-            await conn.run_sync(Base.metadata.create_all)
-            logger.info("数据库初始化完成!")
+            await conn.run_sync(_create_schema)
+            await _write_schema_version(conn, version)
+        async with async_write_session_factory.begin() as session:
+            await todo_crud.sync_counters(session)  # 校准计数器
+        logger.info("数据库初始化完成!")
+        return True
     except Exception as e:
         logger.error(f"数据库初始化失败: {e}")
         raise
 
 
+def _create_schema(conn: Connection):
+    """创建缺失的表，并为已存在的表补建缺失的索引
+
+    SQLite 下 todos 表已存在时补建全文索引表与同步触发器（随 todos 表创建的 DDL 不会执行），
+    全文索引表原本缺失时按 todos 表的现有数据重建索引；不是 AUTOINCREMENT 的 todos 表按新结构重建
+    """
+    from app.models import TODOS_FTS_DDL, Base, Todo
+
+    existing = set(inspect(conn).get_table_names())
+    Base.metadata.create_all(conn)
+    if IS_SQLITE and Todo.__tablename__ in existing:
+        _rebuild_autoincrement(conn)
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    if IS_SQLITE and Todo.__tablename__ in existing:
+        # 最后一条为 rebuild，全文索引表已存在时由触发器保持同步，无需重建
+        statements = TODOS_FTS_DDL if "todos_fts" not in existing else TODOS_FTS_DDL[:-1]
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+
+
+def _rebuild_autoincrement(conn: Connection):
+    """将 todos 表重建为 AUTOINCREMENT 表（仅 SQLite），此后已归档或已删除的 ID 不再被复用
+
+    按新结构建表并复制数据后替换原表，原表的索引与全文索引触发器随原表删除，由调用方补建；
+    ID 不变，全文索引无需重建。ID 序列从活跃表与归档表中最大的 ID 开始
+    """
+    from app.models import Todo, TodoArchive
+
+    name = Todo.__tablename__
+    sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).scalar()
+    if "AUTOINCREMENT" in sql.upper():
+        return
+    logger.info(f"重建 {name} 表以避免复用 ID...")
+    ddl = str(CreateTable(Todo.__table__).compile(dialect=conn.dialect))
+    conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {name}_new ", 1))
+    columns = ", ".join(c.name for c in Todo.__table__.c)
+    conn.exec_driver_sql(f"INSERT INTO {name}_new ({columns}) SELECT {columns} FROM {name}")
+    conn.exec_driver_sql(f"DROP TABLE {name}")
+    conn.exec_driver_sql(f"ALTER TABLE {name}_new RENAME TO {name}")
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (name,))
+    conn.exec_driver_sql(
+        f"INSERT INTO sqlite_sequence (name, seq) SELECT ?, max("
+        f"(SELECT coalesce(max(id), 0) FROM {name}), (SELECT coalesce(max(id), 0) FROM {TodoArchive.__tablename__}))",
+        (name,),
+    )
+
+
+def _schema_version() -> int:
+    """由全部表与索引的 DDL 生成的架构版本号（31 位正整数）"""
+    from app.models import TODOS_FTS_DDL, Base
+
+    dialect = async_write_engine.dialect
+    ddl = [str(CreateTable(table).compile(dialect=dialect)) for table in Base.metadata.sorted_tables]
+    ddl += sorted(  # table.indexes 为集合，迭代顺序随进程的哈希种子变化
+        str(CreateIndex(index).compile(dialect=dialect))
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+    )
+    ddl += TODOS_FTS_DDL
+    return zlib.crc32("\n".join(ddl).encode()) & 0x7FFFFFFF
+
+
+async def _read_schema_version(conn: AsyncConnection) -> int | None:
+    if not IS_SQLITE:
+        return None  # 其他数据库每次执行幂等的建表检查
+    return await conn.scalar(text("PRAGMA user_version"))
+
+
+async def _write_schema_version(conn: AsyncConnection, version: int):
+    if IS_SQLITE:
+        await conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
 async def db_drop():
     """删除数据库表"""
     from app import models  # noqa: F401
@@ -56,7 +160,7 @@ async def db_drop():
         raise RuntimeError("生产环境禁止强制删除数据库表")
     logger.info("开始清理数据库...")
     try:
-        async with async_engine.begin() as conn:
+        async with async_write_engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
             logger.info("数据库清理完成!")
     except Exception as e:
@@ -64,6 +168,16 @@ async def db_drop():
         raise
 
 
+@contextmanager
+def _timed(timings: dict[str, float], phase: str) -> Iterator[None]:
+    """记录启动阶段耗时(毫秒)"""
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = (perf_counter() - started) * 1000
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
@@ -74,15 +188,31 @@ async def lifespan(app: FastAPI):
         f"[+] 主机: {settings.HOST}\n"
         f"[+] 端口: {settings.PORT}"
     )
+    timings: dict[str, float] = {}
+    started = perf_counter()
     try:
         # 确保 settings.DATA_DIR 存在
         settings.DATA_DIR.mkdir(parents=True, exist_ok=True)
-        await db_connect()  # 测试数据库连接
-        if settings.APP_ENV != "production":  # 开发和测试环境下强制删除旧表
-            await db_init(force_drop=True)
-        else:
-            await db_init(force_drop=False)
-        logger.info("应用启动成功!")
+        with _timed(timings, "连接数据库"):
+            await db_connect()  # 测试数据库连接
+        with _timed(timings, "初始化数据库"):
+            # 多个工作进程依次初始化：最先拿到初始化锁的进程成为主进程，只有主进程执行（显式配置的）删除重建，
+            # 其余进程随后读到最新的架构版本直接跳过
+            async with FileLock(lock_path("init")):
+                is_leader = leader.try_acquire()
+                await db_init(force_drop=settings.DB_RESET_ON_START and is_leader)
+        with _timed(timings, "启动后台任务"):
+            await leader.start()  # 非主进程定期重试，主进程退出后接任
+            if settings.WRITE_COALESCING:
+                await write_coalescer.start()  # 启动写操作合并任务
+            await change_feed.start()  # 启动变更推送任务
+            if settings.DUE_SCHEDULER_ENABLED:
+                await due_scheduler.start()  # 启动到期提醒调度任务（订阅变更推送）
+            await stats_maintainer.start()  # 启动统计计数器维护任务
+            if settings.ARCHIVE_ENABLED:
+                await archiver.start()  # 启动归档任务
+        report = "，".join(f"{phase} {ms:.0f}ms" for phase, ms in timings.items())
+        logger.info(f"应用启动成功! 总耗时 {(perf_counter() - started) * 1000:.0f}ms（{report}）")
     except Exception as e:
         logger.error(f"应用启动失败: {e}")
         raise e
@@ -91,9 +221,14 @@ async def lifespan(app: FastAPI):
 
     logger.info(f"应用 {app.title} 关闭...")
     try:
-        if settings.APP_ENV != "production":
-            await db_drop()  # 开发和测试环境下删除数据库表
+        await due_scheduler.stop()
+        await stats_maintainer.stop()
+        await archiver.stop()
+        await write_coalescer.stop()  # 提交剩余的写操作
+        await change_feed.stop()  # 结束所有变更订阅
+        await leader.stop()  # 释放主进程锁
         await async_engine.dispose()
+        await async_write_engine.dispose()
         logger.info("应用关闭成功!")
     except Exception as e:
         logger.error(f"应用关闭失败: {e}")
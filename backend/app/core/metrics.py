@@ -0,0 +1,270 @@
+from bisect import bisect_left
+from collections import Counter as TallyCounter
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Prometheus 默认的延迟分桶(秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+type Labels = tuple[str, ...]
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    """指标基类，实例化时自动注册到全局注册表"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        _registry.append(self)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """单调递增计数器"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels: str):
+        """同步其他组件自行维护的累计值（由收集函数调用）"""
+        self._values[labels] = value
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """瞬时值，通常在采集时由收集函数更新"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[Labels, float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """分桶直方图
+
+    每个标签组合只维护各桶的计数、总和与总数，观测代价为一次二分查找
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Labels = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        self._series: dict[Labels, list[float]] = {}  # 各桶计数（非累计，末位为 +Inf）+ 总和
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1], strict=True):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, f'le="{bound}"')} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+_registry: list[Metric] = []
+_collectors: list[Callable[[], None]] = []
+
+
+def register_collector(collector: Callable[[], None]) -> None:
+    """登记在每次采集前执行的收集函数（用于更新连接池、缓存等瞬时指标）"""
+    _collectors.append(collector)
+
+
+def render() -> str:
+    """以 Prometheus 文本格式输出全部指标"""
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            logger.error(f"指标收集失败: {e}")
+    return "".join(metric.render() for metric in _registry)
+
+
+# HTTP 指标
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP 请求总数", ("method", "route", "status"))
+HTTP_DURATION = Histogram("http_request_duration_seconds", "HTTP 请求处理耗时(秒)", ("method", "route"))
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "正在处理的 HTTP 请求数")
+
+# 数据库指标
+DB_QUERIES = Counter("db_queries_total", "执行的 SQL 语句总数", ("engine",))
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "单条 SQL 执行耗时(秒)", ("engine",), QUERY_BUCKETS)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "单个请求执行的 SQL 语句数", ("method", "route"), COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram("db_time_per_request_seconds", "单个请求的 SQL 执行总耗时(秒)", ("method", "route"))
+DB_N_PLUS_ONE = Counter("db_n_plus_one_total", "疑似 N+1 查询的请求数", ("method", "route"))
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "获取数据库连接的等待耗时(秒)", ("engine",), QUERY_BUCKETS)
+DB_POOL_SIZE = Gauge("db_pool_size", "连接池核心大小", ("engine",))
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "已借出的连接数", ("engine",))
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "超出核心大小的连接数（为负表示核心连接尚未全部创建）", ("engine",))
+
+# 缓存与变更推送指标
+CACHE_REQUESTS = Counter("cache_requests_total", "读缓存查询次数", ("result",))
+CACHE_EVICTIONS = Counter("cache_evictions_total", "读缓存淘汰条目数")
+CHANGE_FEED_SUBSCRIBERS = Gauge("change_feed_subscribers", "变更推送订阅者数")
+
+
+@dataclass(slots=True)
+class RequestStats:
+    """单个请求内的 SQL 统计"""
+
+    queries: int = 0
+    db_time: float = 0.0
+    statements: TallyCounter[str] = field(default_factory=TallyCounter)
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """为同步引擎挂载 SQL 执行计时与计数"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        elapsed = perf_counter() - conn.info["query_started"].pop()
+        DB_QUERIES.inc(name)
+        DB_QUERY_DURATION.observe(elapsed, name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.statements[statement] += 1
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def _route_template(scope: Scope) -> str:
+    """请求匹配的路由模板（避免以具体路径作为标签导致序列数量无限增长）"""
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return "unmatched"
+    # 嵌套路由下路由模板可能不含上级前缀，按请求路径补全
+    path = scope["path"]
+    concrete = template.format(**scope.get("path_params", {}))
+    if path.endswith(concrete):
+        return path[: len(path) - len(concrete)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """请求指标中间件（纯 ASGI 实现，不引入额外的任务切换）
+
+    按路由模板记录请求数、耗时与 SQL 统计；同一语句在单个请求中重复执行
+    超过 METRICS_N_PLUS_ONE_THRESHOLD 次时视为疑似 N+1 查询并记录警告
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message: Message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True  # 长连接推送，耗时不计入请求耗时分布
+            await send(message)
+
+        started = perf_counter()
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - started
+            HTTP_IN_PROGRESS.inc(amount=-1)
+            _request_stats.reset(token)
+            method = scope["method"]
+            route = _route_template(scope)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            if not streaming:
+                HTTP_DURATION.observe(elapsed, method, route)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, method, route)
+            DB_TIME_PER_REQUEST.observe(stats.db_time, method, route)
+            if stats.statements:
+                statement, count = stats.statements.most_common(1)[0]
+                if count > settings.METRICS_N_PLUS_ONE_THRESHOLD:
+                    DB_N_PLUS_ONE.inc(method, route)
+                    logger.warning(f"疑似 N+1 查询: {method} {route} 中同一语句执行了 {count} 次: {statement[:200]}")
@@ -4,6 +4,8 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from app.core.config import get_settings
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilerMiddleware
 
 settings = get_settings()
 
@@ -16,6 +18,7 @@ def register_middlewares(app: FastAPI):
         allow_origins=settings.FRONTEND_URL,  # 允许的前端地址列表
         allow_methods=["*"],  # 允许所有 HTTP 方法
         allow_headers=["*"],  # 允许所有请求头
+        expose_headers=["ETag", "Last-Modified"],  # 允许前端读取缓存校验响应头
         allow_credentials=True,  # 允许携带 Cookie 等凭证
     )
     # GZIP：对大于 1024 字节(1KB)的响应进行压缩，提升传输效率
@@ -28,3 +31,9 @@ def register_middlewares(app: FastAPI):
         TrustedHostMiddleware,
         allowed_hosts=settings.ALLOWED_HOSTS,
     )
+    # Profiler：按请求开启的采样分析，替换响应体为折叠栈（位于 GZip 外层，输出不压缩）
+    if settings.PROFILER_ENABLED:
+        app.add_middleware(ProfilerMiddleware)
+    # Metrics：最后注册的中间件位于最外层，统计包含其他中间件在内的完整耗时
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
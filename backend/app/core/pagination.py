@@ -0,0 +1,36 @@
+import base64
+import binascii
+from typing import Any
+
+import ujson
+
+from app.core.database import INT_MAX, INT_MIN
+from app.core.exception import BizException
+
+
+def encode_cursor(sort: str, key: Any, todo_id: int) -> str:
+    """将 (排序字段, 排序键, ID) 编码为不透明的分页游标"""
+    raw = ujson.dumps([sort, key, todo_id]).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort: str, *, nullable: bool = False) -> tuple[int | None, int]:
+    """解析分页游标，返回 (排序键, ID)
+
+    排序键与 ID 必须是数据库整数列范围内的整数（不含布尔值），排序字段可为空时（nullable）排序键还可以为 null
+
+    Raises:
+        BizException: 游标格式错误或与当前排序方式不匹配时抛出 code=400 的异常
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key, todo_id = ujson.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise BizException(code=400, msg="无效的分页游标")
+    if cursor_sort != sort or not _is_db_int(todo_id) or not (_is_db_int(key) or (nullable and key is None)):
+        raise BizException(code=400, msg="无效的分页游标")
+    return key, todo_id
+
+
+def _is_db_int(value: Any) -> bool:
+    return type(value) is int and INT_MIN <= value <= INT_MAX
@@ -0,0 +1,212 @@
+import asyncio
+import secrets
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from time import perf_counter
+from types import FrameType
+from urllib.parse import parse_qs
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import Counter as MetricCounter
+
+settings = get_settings()
+
+DB_SLOW_QUERIES = MetricCounter("db_slow_queries_total", "超过慢查询阈值的 SQL 语句数", ("engine",))
+
+# 只对数据读写语句执行查询计划分析
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+# 同一语句只分析一次查询计划
+_explained: dict[str, str] = {}
+_EXPLAIN_CACHE_SIZE = 256
+
+
+def instrument_slow_queries(engine: Engine, name: str) -> None:
+    """为同步引擎挂载慢查询日志：执行耗时超过 SLOW_QUERY_THRESHOLD_MS 的语句连同参数与查询计划记录到日志"""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        conn.info.setdefault("slow_query_started", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        elapsed = perf_counter() - conn.info["slow_query_started"].pop()
+        if elapsed < threshold or conn.info.get("explaining"):
+            return
+        DB_SLOW_QUERIES.inc(name)
+        params = parameters[0] if executemany and parameters else parameters
+        message = f"慢查询 [{name}] {elapsed * 1000:.1f}ms: {statement}\n参数: {str(params)[:500]}"
+        if executemany:
+            message += f"（executemany，共 {len(parameters)} 组）"
+        plan = _explain(conn, statement, params) if settings.SLOW_QUERY_EXPLAIN else None
+        if plan:
+            message += f"\n查询计划:\n{plan}"
+        logger.warning(message)
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_started"):
+            conn.info["slow_query_started"].pop()
+
+
+def _explain(conn, statement: str, params) -> str | None:
+    """获取语句的查询计划（SQLite 使用 EXPLAIN QUERY PLAN，其他数据库使用 EXPLAIN）"""
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    if statement in _explained:
+        return _explained[statement]
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    conn.info["explaining"] = True
+    # 在保存点内执行：PostgreSQL 下语句出错会使整个事务中止，分析失败不能影响业务事务
+    savepoint = conn.begin_nested() if not sqlite and conn.in_transaction() else None
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, params).fetchall()
+    except Exception as e:
+        if savepoint is not None:
+            savepoint.rollback()
+        return f"（查询计划获取失败: {e}）"
+    else:
+        if savepoint is not None:
+            savepoint.commit()
+    finally:
+        conn.info["explaining"] = False
+    plan = "\n".join(f"  {row[-1]}" for row in rows)
+    if len(_explained) >= _EXPLAIN_CACHE_SIZE:
+        _explained.pop(next(iter(_explained)))
+    _explained[statement] = plan
+    return plan
+
+
+class SamplingProfiler:
+    """单个请求的采样分析器
+
+    由独立线程按固定间隔对事件循环线程采样：请求所在任务正在运行时记录线程调用栈，
+    任务挂起（等待数据库等 I/O）时记录其协程等待栈，并以 [await] 标记，结果为墙钟时间分布。
+    采样结果以折叠栈格式（每行 "帧;帧;帧 次数"）输出，可直接用 flamegraph.pl / speedscope 绘制火焰图
+    """
+
+    def __init__(self, task: asyncio.Task, *, interval: float):
+        self.task = task
+        self.interval = interval
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            coro_frame = getattr(self.task.get_coro(), "cr_frame", None)
+            if frame is None or coro_frame is None:
+                continue
+            stack = _walk(frame)
+            if coro_frame in stack:  # 请求所在任务正在运行，只保留任务协程以内的帧
+                stack = stack[: stack.index(coro_frame) + 1]
+                self.samples[tuple(_label(f) for f in reversed(stack))] += 1
+            else:
+                self.samples[("[await]", *(_label(f) for f in _await_chain(self.task.get_coro())))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _walk(frame: FrameType | None) -> list[FrameType]:
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    return stack
+
+
+def _await_chain(coro) -> list[FrameType]:
+    """挂起协程的等待链（由外向内），逐层跟随 cr_await / gi_yieldfrom / ag_await"""
+    frames = []
+    while coro is not None and len(frames) < 128:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def profiling_allowed(scope: Scope) -> bool:
+    """请求是否开启了采样分析：通过 X-Profile 请求头或 _profile 查询参数开启，
+    生产环境下还必须通过 X-Profile-Token 请求头提供 SECRET_KEY"""
+    headers = dict(scope["headers"])
+    query = scope["query_string"]
+    requested = headers.get(b"x-profile") == b"1" or (
+        b"_profile" in query and parse_qs(query.decode()).get("_profile") == ["1"]
+    )
+    if not requested:
+        return False
+    if settings.APP_ENV != "production":
+        return True
+    token = headers.get(b"x-profile-token", b"")
+    return secrets.compare_digest(token, settings.SECRET_KEY.encode())
+
+
+class ProfilerMiddleware:
+    """按请求开启的采样分析中间件
+
+    开启分析的请求照常执行，但响应体被替换为该请求的折叠栈（text/plain），
+    原响应状态码与耗时通过 X-Profile-Status、X-Profile-Duration 响应头返回
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not profiling_allowed(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def discard(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        started = perf_counter()
+        with SamplingProfiler(asyncio.current_task(), interval=settings.PROFILER_INTERVAL_MS / 1000) as profiler:
+            await self.app(scope, receive, discard)
+        elapsed = perf_counter() - started
+
+        body = profiler.folded().encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-status", str(status).encode()),
+                    (b"x-profile-duration", f"{elapsed * 1000:.1f}ms".encode()),
+                    (b"x-profile-samples", str(profiler.samples.total()).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,159 @@
+import asyncio
+import heapq
+import inspect
+from collections.abc import Callable
+from contextlib import aclosing
+from time import time
+from typing import Any
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.coordination import leader
+from app.core.database import async_session_factory
+from app.core.events import change_feed
+from app.core.metrics import Counter, Gauge, register_collector
+from app.core.tasks import BackgroundTask
+
+settings = get_settings()
+
+DUE_NOTIFICATIONS = Counter("due_notifications_total", "已发出的到期通知数")
+DUE_HOOK_FAILURES = Counter("due_hook_failures_total", "到期通知钩子执行失败次数")
+DUE_SCHEDULED = Gauge("due_scheduled", "内存中等待到期的 Todo 数")
+
+type DueKey = tuple[int, int]  # (截止时间, ID)
+type DueHook = Callable[[list[dict[str, Any]]], Any]
+
+
+def log_due(todos: list[dict[str, Any]]) -> None:
+    """默认的到期通知钩子：记录日志"""
+    for todo in todos:
+        logger.info(f"Todo 已到期: id={todo['id']}, title={todo['title']}, deadline={todo['deadline']}")
+
+
+class DueScheduler(BackgroundTask):
+    """到期 Todo 调度器
+
+    - 以 (截止时间, ID) 为键的小顶堆保存即将到期的未完成 Todo，内存中最多保留约 window 条，
+      已加载的全部到期后再从部分索引加载后续一批，代价与未完成 Todo 的总数无关
+    - 订阅变更推送增量维护：新建或修改后落在已加载范围内的 Todo 入堆，
+      完成、删除或修改了截止时间的 Todo 原有的堆条目失效（惰性删除，出堆时跳过）
+    - 每隔 tick 秒取出已到期的 Todo，批量调用通知钩子（可为协程函数），每个 Todo 只通知一次
+    - 多进程下只在主进程运行，避免重复通知；启动前已过期的 Todo 不补发通知
+    """
+
+    name = "due-scheduler"
+
+    def __init__(self, *, hook: DueHook, window: int, tick: float):
+        super().__init__()
+        self._hook = hook
+        self._window = window
+        self._tick = tick
+        self._heap: list[DueKey] = []
+        self._scheduled: dict[int, dict[str, Any]] = {}  # 堆中有效的 Todo（ID -> 当前数据）
+        self._notified: DueKey = (0, 0)  # 已通知的最大键，只调度晚于该键的 Todo
+        self._horizon: DueKey | None = None  # 已加载范围的上界，为空表示已加载全部未完成 Todo
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    async def start(self):
+        """启动后台调度任务，启动前已过期的 Todo 不补发通知"""
+        if not self.running:
+            self._notified = max(self._notified, (int(time()), 0))
+        await super().start()
+
+    async def _run(self):
+        """非主进程等待成为主进程；主进程持续调度，出错后重新加载"""
+        while True:
+            if leader.is_leader:
+                try:
+                    await self._schedule()
+                except Exception as e:
+                    logger.error(f"到期调度失败: {str(e)}")
+            await asyncio.sleep(self._tick if leader.is_leader else settings.LEADER_RETRY_INTERVAL)
+
+    async def _schedule(self):
+        since = change_feed.last_seq  # 先取序号再加载，加载期间提交的变更随后重放
+        await self._load(reset=True)
+        async with aclosing(change_feed.subscribe(since, heartbeat=self._tick)) as feed:
+            async for events in feed:  # 空闲 tick 秒时产出空列表
+                for event in events:
+                    if event["op"] == "reset":
+                        await self._load(reset=True)
+                    else:
+                        self._apply(event["id"], event["data"])
+                await self._fire()
+                if not self._scheduled and self._horizon is not None:
+                    await self._load()
+                self._trim()
+
+    async def _load(self, *, reset: bool = False):
+        """从已加载范围的上界（重置时从已通知的位置）起加载下一批未完成的 Todo"""
+        from app.crud import todo_crud
+
+        self._heap.clear()
+        self._scheduled.clear()
+        if reset:
+            self._horizon = self._notified
+        async with async_session_factory() as session:
+            todos = await todo_crud.get_pending(session, after=self._horizon, limit=self._window)
+        for todo in todos:
+            self._push(todo)
+        self._horizon = (todos[-1]["deadline"], todos[-1]["id"]) if len(todos) == self._window else None
+
+    def _push(self, todo: dict[str, Any]):
+        self._scheduled[todo["id"]] = todo
+        heapq.heappush(self._heap, (todo["deadline"], todo["id"]))
+
+    def _apply(self, todo_id: int, todo: dict[str, Any] | None):
+        """应用一条变更（todo 为变更后的当前数据，已删除时为空）"""
+        self._scheduled.pop(todo_id, None)  # 原有的堆条目失效
+        if todo is None or todo["completed"] or todo["deadline"] is None:
+            return
+        key = (todo["deadline"], todo_id)
+        if key > self._notified and (self._horizon is None or key <= self._horizon):
+            self._push(todo)
+
+    async def _fire(self):
+        """取出已到期的 Todo 并调用通知钩子"""
+        now = int(time())
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            key = heapq.heappop(self._heap)
+            todo = self._scheduled.get(key[1])
+            if todo is None or todo["deadline"] != key[0]:  # 已失效的条目
+                continue
+            del self._scheduled[key[1]]
+            self._notified = key
+            due.append(todo)
+        if not due:
+            return
+        DUE_NOTIFICATIONS.inc(amount=len(due))
+        try:
+            result = self._hook(due)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            DUE_HOOK_FAILURES.inc()
+            logger.error(f"到期通知钩子执行失败: {str(e)}")
+
+    def _trim(self):
+        """堆中条目（含失效条目）过多时重建：只保留最早的 window 条，并相应收缩已加载范围"""
+        if len(self._heap) <= 2 * self._window:
+            return
+        keys = sorted((todo["deadline"], todo_id) for todo_id, todo in self._scheduled.items())
+        if len(keys) > self._window:
+            for _, todo_id in keys[self._window :]:
+                del self._scheduled[todo_id]
+            keys = keys[: self._window]
+            self._horizon = keys[-1]
+        self._heap = keys  # 有序列表即是合法的堆
+
+
+due_scheduler = DueScheduler(
+    hook=settings.DUE_HOOK or log_due,
+    window=settings.DUE_SCHEDULER_WINDOW,
+    tick=settings.DUE_SCHEDULER_TICK,
+)
+register_collector(lambda: DUE_SCHEDULED.set(len(due_scheduler)))
@@ -0,0 +1,60 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+from app.core.metrics import Counter, Gauge, register_collector
+
+SINGLE_FLIGHT_CALLS = Counter("single_flight_calls_total", "合并查询的调用次数", ("result",))
+SINGLE_FLIGHT_IN_FLIGHT = Gauge("single_flight_in_flight", "正在执行的合并查询数")
+
+
+class SingleFlight:
+    """合并相同键的并发调用
+
+    同一键同一时刻只执行一次：第一个调用者执行查询，期间到达的调用者等待并共享其结果（或异常）。
+    与缓存不同，查询完成后不保留任何结果，之后的调用重新执行。
+    执行查询的调用者被取消（如客户端断开）时，等待中的调用者重新发起查询，不受其影响
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do[T](self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """执行 fn，或等待相同键正在执行的调用并共享其结果"""
+        while True:
+            future = self._flights.get(key)
+            if future is None:
+                return await self._lead(key, fn)
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise  # 自身被取消
+                continue  # 执行查询的调用者被取消，重新发起
+            SINGLE_FLIGHT_CALLS.inc("shared")
+            return result
+
+    async def _lead[T](self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        SINGLE_FLIGHT_CALLS.inc("executed")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 标记异常已读取，无等待者时不输出未处理异常警告
+            raise
+        finally:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        future.set_result(result)
+        return result
+
+
+read_flight = SingleFlight()
+register_collector(lambda: SINGLE_FLIGHT_IN_FLIGHT.set(len(read_flight)))
@@ -0,0 +1,68 @@
+import asyncio
+from time import monotonic, time
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.coordination import leader
+from app.core.database import async_write_session_factory
+from app.core.metrics import Counter
+from app.core.tasks import BackgroundTask
+
+settings = get_settings()
+
+STATS_DRIFT = Counter("stats_counter_drift_total", "校准时发现的统计计数器偏差（绝对值之和）", ("counter",))
+
+
+class StatsMaintainer(BackgroundTask):
+    """统计计数器维护任务（多进程下只由主进程执行）
+
+    - 每隔 STATS_OVERDUE_INTERVAL 秒推进逾期统计时间点，将新到期的未完成 Todo 计入逾期数，
+      使统计接口读取时需要补充统计的范围保持很小
+    - 每隔 STATS_RECONCILE_INTERVAL 秒按实际数据校准全部计数器，修正漂移并记录偏差
+    """
+
+    name = "stats-maintainer"
+
+    def __init__(self, *, overdue_interval: float, reconcile_interval: float):
+        super().__init__()
+        self._overdue_interval = overdue_interval
+        self._reconcile_interval = reconcile_interval
+
+    async def _run(self):
+        last_reconciled = monotonic()
+        while True:
+            await asyncio.sleep(self._overdue_interval)
+            if not leader.is_leader:
+                continue
+            try:
+                if self._reconcile_interval > 0 and monotonic() - last_reconciled >= self._reconcile_interval:
+                    await self.reconcile()
+                    last_reconciled = monotonic()
+                else:
+                    await self.advance()
+            except Exception as e:
+                logger.error(f"维护统计计数器失败: {str(e)}")
+
+    async def advance(self):
+        """推进逾期统计时间点到当前时间"""
+        from app.crud import todo_crud
+
+        async with async_write_session_factory.begin() as session:
+            await todo_crud.advance_overdue(session, until=int(time()))
+
+    async def reconcile(self):
+        """按实际数据校准计数器"""
+        from app.crud import todo_crud
+
+        async with async_write_session_factory.begin() as session:
+            drift = await todo_crud.sync_counters(session)
+        for name, (old, new) in drift.items():
+            STATS_DRIFT.inc(name, amount=abs(new - (old or 0)))
+            logger.warning(f"统计计数器 {name} 已校准: {old} -> {new}")
+
+
+stats_maintainer = StatsMaintainer(
+    overdue_interval=settings.STATS_OVERDUE_INTERVAL,
+    reconcile_interval=settings.STATS_RECONCILE_INTERVAL,
+)
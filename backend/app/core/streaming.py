@@ -0,0 +1,158 @@
+import codecs
+import csv
+import io
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, Literal, NamedTuple
+
+import ujson
+
+type StreamFormat = Literal["ndjson", "csv"]
+
+# 各格式对应的媒体类型
+MEDIA_TYPES: dict[StreamFormat, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def encode_ndjson(rows: Sequence[dict[str, Any]]) -> bytes:
+    """将一批数据编码为 NDJSON（每行一个 JSON 对象）"""
+    return "".join(ujson.dumps(row, ensure_ascii=False, escape_forward_slashes=False) + "\n" for row in rows).encode()
+
+
+def encode_csv(rows: Sequence[dict[str, Any]], fieldnames: Sequence[str], *, header: bool = False) -> bytes:
+    """将一批数据编码为 CSV"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def encode_stream(
+    batches: AsyncIterator[list[dict[str, Any]]],
+    fmt: StreamFormat,
+    fieldnames: Sequence[str],
+) -> AsyncIterator[bytes]:
+    """逐批增量编码数据流，每批产出一个响应块"""
+    if fmt == "csv":
+        yield encode_csv([], fieldnames, header=True)
+    async for rows in batches:
+        yield encode_ndjson(rows) if fmt == "ndjson" else encode_csv(rows, fieldnames)
+
+
+def encode_sse(events: Sequence[dict[str, Any]]) -> bytes:
+    """将一批变更事件编码为 SSE 消息，以事件序号作为消息 ID（断线重连时由浏览器通过 Last-Event-ID 回传）"""
+    return "".join(
+        f"id: {event['seq']}\ndata: {ujson.dumps(event, ensure_ascii=False, escape_forward_slashes=False)}\n\n"
+        for event in events
+    ).encode()
+
+
+class Record(NamedTuple):
+    """解析出的单条记录"""
+
+    line: int  # 记录起始行号（从 1 开始）
+    data: dict[str, Any] | None  # 记录数据，解析失败时为空
+    error: str | None = None  # 解析错误信息
+
+
+class LineTooLong(ValueError):
+    """单行（或 CSV 中跨行的单条记录）超过长度上限"""
+
+    def __init__(self, line: int, limit: int):
+        super().__init__(f"第 {line} 行超过 {limit} 字节的长度上限")
+        self.line = line
+        self.limit = limit
+
+
+async def iter_lines(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[tuple[int, str | None]]:
+    """将字节流增量切分为文本行，返回 (行号, 行内容)，行内容无法按 UTF-8 解码时为空
+
+    首行开头的 UTF-8 BOM（如 Excel 保存的 CSV）会被去除；单行超过 max_line_bytes 时抛出 LineTooLong，
+    缓冲区不会随没有换行的请求体无限增长
+
+    Raises:
+        LineTooLong: 单行超过长度上限
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLong(line_no, max_line_bytes)
+            yield line_no, _decode_line(line.removeprefix(codecs.BOM_UTF8) if line_no == 1 else line)
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(line_no + 1, max_line_bytes)
+    if buffer:
+        yield line_no + 1, _decode_line(buffer.removeprefix(codecs.BOM_UTF8) if line_no == 0 else buffer)
+
+
+def _decode_line(line: bytes) -> str | None:
+    try:
+        return line.decode().rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_ndjson(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Record]:
+    """增量解析 NDJSON 字节流，跳过空行"""
+    async for line_no, line in iter_lines(stream, max_line_bytes):
+        if line is None:
+            yield Record(line_no, None, "无法按 UTF-8 解码")
+        elif line.strip():
+            try:
+                data = ujson.loads(line)
+            except ValueError:
+                yield Record(line_no, None, "JSON 格式错误")
+                continue
+            if isinstance(data, dict):
+                yield Record(line_no, data)
+            else:
+                yield Record(line_no, None, "每行必须是一个 JSON 对象")
+
+
+async def iter_csv(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Record]:
+    """增量解析带表头的 CSV 字节流
+
+    引号内的换行会使一条记录跨越多行，按引号是否闭合拼接（拼接后的记录同样受 max_line_bytes 限制）；
+    空单元格视为未提供该字段
+    """
+    header: list[str] | None = None
+    pending: list[str] = []
+    start = 0
+    async for line_no, line in iter_lines(stream, max_line_bytes):
+        if line is None:
+            yield Record(line_no, None, "无法按 UTF-8 解码")
+            pending = []
+            continue
+        if not pending:
+            start = line_no
+        pending.append(line)
+        text = "\n".join(pending)
+        if text.count('"') % 2:  # 引号未闭合，记录延续到下一行
+            if len(text) > max_line_bytes:
+                raise LineTooLong(start, max_line_bytes)
+            continue
+        pending = []
+        if not text.strip():
+            continue
+        row = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [name.strip() for name in row]
+            continue
+        if len(row) > len(header):
+            yield Record(start, None, "列数多于表头")
+            continue
+        yield Record(start, {name: value for name, value in zip(header, row, strict=False) if value != ""})
+    if pending:
+        yield Record(start, None, "引号未闭合")
+
+
+def decode_stream(stream: AsyncIterator[bytes], fmt: StreamFormat, *, max_line_bytes: int) -> AsyncIterator[Record]:
+    """按格式增量解析字节流，单行超过 max_line_bytes 时抛出 LineTooLong"""
+    return iter_ndjson(stream, max_line_bytes) if fmt == "ndjson" else iter_csv(stream, max_line_bytes)
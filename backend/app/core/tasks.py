@@ -0,0 +1,32 @@
+import asyncio
+
+
+class BackgroundTask:
+    """由单个 asyncio 任务执行的后台服务
+
+    子类实现 _run 作为任务主体；start 在未运行时创建任务，stop 取消任务并等待其结束
+    """
+
+    name = "background-task"  # asyncio 任务名
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """启动后台任务（已在运行时不重复启动）"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self):
+        """取消后台任务并等待其结束"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        raise NotImplementedError
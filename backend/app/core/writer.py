@@ -0,0 +1,131 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import async_write_session_factory
+from app.core.exception import BizException
+from app.core.tasks import BackgroundTask
+
+settings = get_settings()
+
+type WriteFn = Callable[..., Awaitable[Any]]
+
+
+class Writer(Protocol):
+    """写操作执行器
+
+    写操作统一以 fn(session, **kwargs) 的形式提交，由执行器决定在哪个会话和事务中运行
+    """
+
+    async def run(self, fn: WriteFn, /, **kwargs: Any) -> Any: ...
+
+
+class SessionWriter:
+    """在请求自身的会话（事务）中直接执行写操作"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def run(self, fn: WriteFn, /, **kwargs: Any) -> Any:
+        return await fn(self.session, **kwargs)
+
+
+class WriteCoalescer(BackgroundTask):
+    """写操作合并器（组提交）
+
+    由单个后台任务串行消费写操作队列，将短时间窗口内（或达到数量上限前）到达的写操作
+    合并到同一事务中，只提交一次。每个写操作在独立的 SAVEPOINT 中执行，
+    单个操作失败只回滚自身，不影响同批次的其他操作。
+    """
+
+    name = "write-coalescer"
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], *, window: float, max_batch: int):
+        super().__init__()
+        self._session_factory = session_factory
+        self._window = window
+        self._max_batch = max_batch
+        self._queue: asyncio.Queue[tuple[WriteFn, dict[str, Any], asyncio.Future] | None] = asyncio.Queue()
+
+    async def stop(self):
+        """处理完队列中剩余的写操作后停止后台写任务"""
+        if self.running:
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+
+    async def run(self, fn: WriteFn, /, **kwargs: Any) -> Any:
+        """提交写操作并等待其所在批次提交完成"""
+        if not self.running:
+            raise RuntimeError("写操作合并器未启动")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, kwargs, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            job = await self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+            deadline = loop.time() + self._window
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            await self._commit(batch)
+
+    async def _commit(self, batch: list[tuple[WriteFn, dict[str, Any], asyncio.Future]]):
+        """在同一事务中执行一批写操作并提交"""
+        outcomes: list[tuple[asyncio.Future, Any, BaseException | None]] = []
+        try:
+            async with self._session_factory() as session, session.begin():
+                for fn, kwargs, future in batch:
+                    if future.done():  # 提交方已取消
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            outcomes.append((future, await fn(session, **kwargs), None))
+                    except SQLAlchemyError as e:
+                        logger.error(f"数据库操作失败: {str(e)}")
+                        outcomes.append((future, None, BizException(code=500, msg="服务器内部错误")))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # 事务整体失败：已单独失败的操作保留自身的错误，其余操作统一返回服务器错误
+            logger.error(f"批量提交失败: {str(e)}")
+            errors = {id(future): error for future, _, error in outcomes}
+            outcomes = [
+                (future, None, errors.get(id(future)) or BizException(code=500, msg="服务器内部错误"))
+                for _, _, future in batch
+            ]
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+write_coalescer = WriteCoalescer(
+    async_write_session_factory,
+    window=settings.WRITE_COALESCING_WINDOW_MS / 1000,
+    max_batch=settings.WRITE_COALESCING_MAX_BATCH,
+)
@@ -1,9 +1,44 @@
-from sqlalchemy import func, select
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from time import time
+from typing import Any, Literal
+
+from sqlalchemy import (
+    ColumnCollection,
+    ColumnElement,
+    Select,
+    Table,
+    and_,
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import begin_version, todo_cache
+from app.core.config import get_settings
+from app.core.database import IS_POSTGRESQL, IS_SQLITE, has_uncommitted_writes, on_commit
+from app.core.events import change_feed
 from app.core.exception import BizException
-from app.models import Todo
-from app.schemas import TodoCreate, TodoUpdate
+from app.core.singleflight import read_flight
+from app.models import PENDING, Todo, TodoArchive, TodoChange, TodoCounter
+from app.schemas import TodoBatchUpdate, TodoCreate, TodoFilter, TodoUpdate
+
+settings = get_settings()
+
+type ChangeOp = Literal["created", "updated", "deleted", "archived"]
 
 
 class TodoCRUD:
@@ -26,23 +61,44 @@ class TodoCRUD:
         session.add(db_todo)
         await session.flush()
         await session.refresh(db_todo)
+        await self._bump_counter(session, "total", 1)
+        await self._adjust_stats(session, after=[(db_todo.completed, db_todo.deadline)])
+        await self._changed(session, "created", [db_todo.id])
         return db_todo
 
-    async def get(self, session: AsyncSession, *, todo_id: int) -> Todo | None:
+    async def get(self, session: AsyncSession, *, todo_id: int) -> dict[str, Any] | None:
         """根据 ID 获取单个 Todo 项
 
+        优先读取缓存，未命中时查询数据库并回填缓存（相同 ID 的并发查询合并为一次），活跃表中不存在时回退到归档表；
+        当前事务中有未提交的写操作时绕过缓存
+
         Args:
             session: 异步数据库会话
             todo_id: 要获取的 Todo ID
 
         Returns:
-            找到的 Todo 对象，如果不存在则返回 None
+            找到的 Todo 数据，如果不存在则返回 None
         """
-        stmt = select(Todo).where(Todo.id == todo_id)
-        result = await session.execute(stmt)
-        return result.scalar_one_or_none()
+        use_cache = not has_uncommitted_writes(session)
+        if use_cache and (cached := todo_cache.get_item(todo_id)) is not None:
+            return cached
+
+        async def load() -> dict[str, Any] | None:
+            stmt = select(*Todo.__table__.c).where(Todo.id == todo_id)
+            row = (await session.execute(stmt)).mappings().one_or_none()
+            if row is None:
+                stmt = select(*ARCHIVE_COLUMNS).where(TodoArchive.id == todo_id)
+                row = (await session.execute(stmt)).mappings().one_or_none()
+            if row is None:
+                return None
+            todo = dict(row)
+            if use_cache:
+                todo_cache.set_item(todo_id, todo, begin_version(session))
+            return todo
+
+        return await _single_flight(session, ("get", todo_id), load)
 
-    async def get_or_404(self, session: AsyncSession, *, todo_id: int) -> Todo:
+    async def get_or_404(self, session: AsyncSession, *, todo_id: int) -> dict[str, Any]:
         """获取单个 Todo 项，不存在时抛出 404 异常
 
         Args:
@@ -50,7 +106,7 @@ class TodoCRUD:
             todo_id: 要获取的 Todo ID
 
         Returns:
-            找到的 Todo 对象
+            找到的 Todo 数据
 
         Raises:
             BizException: 当 Todo 不存在时抛出 code=404 的异常
@@ -60,45 +116,161 @@ class TodoCRUD:
             raise BizException(code=404, msg="Todo not found")
         return todo
 
-    async def get_multi(self, session: AsyncSession, *, skip: int = 0, limit: int = 100) -> list[Todo]:
+    async def get_multi(
+        self,
+        session: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        after: tuple[Any, int] | None = None,
+        filters: TodoFilter | None = None,
+    ) -> list[dict[str, Any]]:
         """获取多个 Todo 项（分页查询）
 
+        支持两种分页方式：
+        - 偏移分页：通过 skip 跳过指定数量的记录，适合小表
+        - 游标分页：通过 after 传入上一页最后一条记录的 (排序键, ID)，
+          直接按 (排序字段, ID) 索引定位起点，查询代价与页深无关
+
+        查询结果按分页与筛选参数缓存，任何写操作提交后失效；相同参数的并发查询合并为一次。
+        筛选参数 include_archived 为 true 时同时查询归档表：两张表各自按索引取出前 skip + limit 条后合并排序
+
+        Args:
+            session: 异步数据库会话
+            skip: 跳过的记录数（用于偏移分页，传入 after 时忽略）
+            limit: 返回的最大记录数
+            after: 上一页最后一条记录的 (排序键, ID)（用于游标分页）
+            filters: 筛选与排序参数（默认按 ID 升序，不筛选）
+
+        Returns:
+            Todo 数据列表
+        """
+        filters = filters or TodoFilter()
+        if after is not None:
+            skip = 0
+        cache_key = ("multi", skip, limit, after, _filter_key(filters))
+        use_cache = not has_uncommitted_writes(session)
+        if use_cache and (cached := todo_cache.get_page(cache_key)) is not None:
+            return cached
+
+        async def load() -> list[dict[str, Any]]:
+            if filters.include_archived:
+                arms = [
+                    select(*_page_query(table, filters, after=after, limit=skip + limit).subquery().c)
+                    for table in (Todo.__table__, TodoArchive.__table__)
+                ]
+                merged = union_all(*arms).subquery()
+                stmt = _order_page(select(*merged.c), merged.c, filters)
+                todos = [dict(row) for row in (await session.execute(stmt.offset(skip).limit(limit))).mappings()]
+            else:
+                # 游标之后的记录按排序先后分为若干段（非 NULL 值与 NULL 值），逐段按索引定位，取满一页即止
+                todos = []
+                base = _apply_filter(select(*Todo.__table__.c), filters)
+                for clause in _keyset_clauses(Todo.__table__, filters, after):
+                    stmt = _order_page(base.where(clause), Todo.__table__.c, filters, nulls=after is None)
+                    result = await session.execute(stmt.offset(skip).limit(limit - len(todos)))
+                    todos += [dict(row) for row in result.mappings()]
+                    if len(todos) >= limit:
+                        break
+            if use_cache:
+                todo_cache.set_page(cache_key, todos, begin_version(session))
+            return todos
+
+        return await _single_flight(session, cache_key, load)
+
+    async def get_pending(
+        self,
+        session: AsyncSession,
+        *,
+        before: int | None = None,
+        after: tuple[int, int] | None = None,
+        limit: int = 100,
+    ) -> list[dict[str, Any]]:
+        """按截止时间获取未完成的 Todo 项
+
+        按 (截止时间, ID) 升序返回设置了截止时间的未完成 Todo，走未完成 Todo 的部分索引，
+        以 (截止时间, ID) 为游标定位起点，代价与页深及已完成的数据量无关；不经过缓存
+
         Args:
             session: 异步数据库会话
-            skip: 跳过的记录数（用于分页）
+            before: 截止时间上限（含），为空时不限制
+            after: 上一批最后一条记录的 (截止时间, ID)，为空时从最早的开始
             limit: 返回的最大记录数
 
         Returns:
-            Todo 对象列表
+            Todo 数据列表
         """
-        stmt = select(Todo).offset(skip).limit(limit)
-        result = await session.execute(stmt)
-        return result.scalars().all()
+        stmt = select(*Todo.__table__.c).where(PENDING, Todo.deadline.is_not(None))
+        if before is not None:
+            stmt = stmt.where(Todo.deadline <= before)
+        if after is not None:
+            stmt = stmt.where(tuple_(Todo.deadline, Todo.id) > tuple_(*after))
+        stmt = stmt.order_by(Todo.deadline, Todo.id).limit(limit)
+        return [dict(row) for row in (await session.execute(stmt)).mappings()]
+
+    async def iter_batches(
+        self, session: AsyncSession, *, batch_size: int = 1000
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """按 ID 顺序分批流式读取全部 Todo 项
+
+        使用服务端游标（yield_per）逐批读取，内存占用与表大小无关，不经过缓存
+
+        Args:
+            session: 异步数据库会话
+            batch_size: 每批读取的行数
 
-    async def update(self, session: AsyncSession, *, todo_id: int, todo_in: TodoUpdate) -> Todo:
+        Yields:
+            每批 Todo 数据列表
+        """
+        stmt = select(*Todo.__table__.c).order_by(Todo.id).execution_options(yield_per=batch_size)
+        result = await session.stream(stmt)
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+    async def update(self, session: AsyncSession, *, todo_id: int, todo_in: TodoUpdate) -> dict[str, Any]:
         """更新指定的 Todo 项
 
+        以单条 UPDATE ... RETURNING 语句完成更新与存在性检查，不经过 ORM 身份映射；
+        修改完成状态或截止时间时，先以一条语句按原值与新值调整完成数与逾期数计数器；
+        Todo 已归档时先移回活跃表再修改，没有修改内容时与读取相同直接返回归档的数据
+
         Args:
             session: 异步数据库会话
             todo_id: 要更新的 Todo ID
             todo_in: 包含更新数据的 TodoUpdate 对象
 
         Returns:
-            更新后的 Todo 对象
+            更新后的 Todo 数据
 
         Raises:
             BizException: 当 Todo 不存在时抛出 code=404 的异常
         """
-        db_todo = await self.get_or_404(session, todo_id=todo_id)
         update_data = todo_in.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_todo, key, value)
-        await session.flush()
-        return db_todo
+        if update_data.keys() & STATS_FIELDS:
+            await self._adjust_stats_for_update(session, [todo_id], update_data)
+        if update_data:
+            stmt = update(Todo.__table__).where(Todo.id == todo_id).values(**update_data).returning(*Todo.__table__.c)
+        else:
+            stmt = select(*Todo.__table__.c).where(Todo.id == todo_id)
+        row = (await session.execute(stmt)).mappings().one_or_none()
+        if row is None and update_data and await self._restore(session, [todo_id]):  # 已归档，移回活跃表后修改
+            if update_data.keys() & STATS_FIELDS:
+                await self._adjust_stats_for_update(session, [todo_id], update_data)
+            row = (await session.execute(stmt)).mappings().one_or_none()
+        if row is None and not update_data:
+            stmt = select(*ARCHIVE_COLUMNS).where(TodoArchive.id == todo_id)
+            row = (await session.execute(stmt)).mappings().one_or_none()
+        if row is None:
+            raise BizException(code=404, msg="Todo not found")
+        if update_data:
+            await self._changed(session, "updated", [todo_id])
+        return dict(row)
 
     async def delete(self, session: AsyncSession, *, todo_id: int) -> bool:
         """删除指定的 Todo 项
 
+        以单条 DELETE ... RETURNING 语句完成删除与存在性检查，活跃表中不存在时从归档表删除
+
         Args:
             session: 异步数据库会话
             todo_id: 要删除的 Todo ID
@@ -106,23 +278,700 @@ class TodoCRUD:
         Returns:
             bool: 删除操作是否成功执行（True: 成功删除, False: 记录不存在）
         """
-        db_todo = await self.get(session, todo_id=todo_id)
-        if not db_todo:
-            return False
-        await session.delete(db_todo)
-        await session.flush()
+        stmt = delete(Todo.__table__).where(Todo.id == todo_id).returning(Todo.completed, Todo.deadline)
+        row = (await session.execute(stmt)).one_or_none()
+        if row is None:
+            if not await self._delete_archived(session, [todo_id]):
+                return False
+        else:
+            await self._bump_counter(session, "total", -1)
+            await self._adjust_stats(session, before=[tuple(row)])
+        await self._changed(session, "deleted", [todo_id])
         return True
 
-    async def count(self, session: AsyncSession) -> int:
+    async def create_many(self, session: AsyncSession, *, todos_in: list[TodoCreate]) -> list[Todo]:
+        """批量创建 Todo 项
+
+        以单条 INSERT ... RETURNING 语句（executemany）写入所有记录
+
+        Args:
+            session: 异步数据库会话
+            todos_in: TodoCreate 对象列表
+
+        Returns:
+            新创建的 Todo 对象列表（与输入顺序一致）
+        """
+        if not todos_in:
+            return []
+        stmt = insert(Todo).returning(Todo, sort_by_parameter_order=True)
+        result = await session.scalars(stmt, [todo_in.model_dump() for todo_in in todos_in])
+        db_todos = result.all()
+        await self._bump_counter(session, "total", len(db_todos))
+        await self._adjust_stats(session, after=[(db_todo.completed, db_todo.deadline) for db_todo in db_todos])
+        await self._changed(session, "created", [db_todo.id for db_todo in db_todos])
+        return db_todos
+
+    async def insert_many(self, session: AsyncSession, *, todos_in: list[TodoCreate]) -> list[int]:
+        """批量写入 Todo 项（用于导入）
+
+        与 create_many 相同以单条 executemany 语句写入，但只返回 ID，不构建 ORM 对象；
+        PostgreSQL 下行数达到 COPY_MIN_ROWS 时改用 COPY 写入
+
+        Args:
+            session: 异步数据库会话
+            todos_in: TodoCreate 对象列表
+
+        Returns:
+            新创建的 Todo ID 列表
+        """
+        if not todos_in:
+            return []
+        if IS_POSTGRESQL and len(todos_in) >= COPY_MIN_ROWS:
+            ids = await self._copy_todos(session, todos_in)
+        else:
+            stmt = insert(Todo.__table__).returning(Todo.id, sort_by_parameter_order=True)
+            result = await session.scalars(stmt, [todo_in.model_dump() for todo_in in todos_in])
+            ids = result.all()
+        await self._bump_counter(session, "total", len(ids))
+        await self._adjust_stats(session, after=[(False, todo_in.deadline) for todo_in in todos_in])
+        await self._changed(session, "created", ids)
+        return ids
+
+    async def update_many(
+        self, session: AsyncSession, *, todos_in: list[TodoBatchUpdate]
+    ) -> dict[int, Todo | TodoArchive]:
+        """批量更新 Todo 项
+
+        更新内容相同的条目合并为一条 UPDATE ... WHERE id IN (...) RETURNING 语句，已归档的 Todo 先移回活跃表；
+        没有修改内容的已归档 Todo 不移回，直接返回归档的数据
+
+        Args:
+            session: 异步数据库会话
+            todos_in: TodoBatchUpdate 对象列表
+
+        Returns:
+            以 ID 为键的更新后 Todo 对象字典（不存在的 ID 不包含在内）
+        """
+        groups: dict[tuple, list[int]] = {}
+        for todo_in in todos_in:
+            update_data = todo_in.model_dump(exclude_unset=True, exclude={"id"})
+            groups.setdefault(tuple(sorted(update_data.items())), []).append(todo_in.id)
+        await self._restore(session, [todo_id for changes, ids in groups.items() if changes for todo_id in ids])
+
+        updated: dict[int, Todo | TodoArchive] = {}
+        changed: list[int] = []
+        for changes, ids in groups.items():
+            if dict(changes).keys() & STATS_FIELDS:
+                await self._adjust_stats_for_update(session, ids, dict(changes))
+            if changes:
+                stmt = update(Todo).where(Todo.id.in_(ids)).values(**dict(changes)).returning(Todo)
+            else:
+                stmt = select(Todo).where(Todo.id.in_(ids))
+            db_todos = (await session.scalars(stmt)).all()
+            updated.update({db_todo.id: db_todo for db_todo in db_todos})
+            if changes:
+                changed.extend(db_todo.id for db_todo in db_todos)
+            elif missing := [todo_id for todo_id in ids if todo_id not in updated]:
+                updated.update(
+                    {
+                        row.id: row
+                        for row in await session.scalars(select(TodoArchive).where(TodoArchive.id.in_(missing)))
+                    }
+                )
+        await self._changed(session, "updated", changed)
+        return updated
+
+    async def delete_many(self, session: AsyncSession, *, ids: list[int]) -> set[int]:
+        """批量删除 Todo 项
+
+        以单条 DELETE ... WHERE id IN (...) RETURNING 语句执行，活跃表中不存在的 ID 再从归档表删除
+
+        Args:
+            session: 异步数据库会话
+            ids: 要删除的 Todo ID 列表
+
+        Returns:
+            实际删除的 Todo ID 集合
+        """
+        if not ids:
+            return set()
+        stmt = delete(Todo).where(Todo.id.in_(ids)).returning(Todo.id, Todo.completed, Todo.deadline)
+        rows = (await session.execute(stmt)).all()
+        deleted = {row.id for row in rows}
+        await self._bump_counter(session, "total", -len(deleted))
+        await self._adjust_stats(session, before=[(row.completed, row.deadline) for row in rows])
+        deleted.update(await self._delete_archived(session, [todo_id for todo_id in ids if todo_id not in deleted]))
+        await self._changed(session, "deleted", deleted)
+        return deleted
+
+    async def count(self, session: AsyncSession, *, filters: TodoFilter | None = None, exact: bool = False) -> int:
         """统计 Todo 总数
 
+        无筛选条件时默认读取随写操作维护的计数器（主键查询，与表大小无关，结果会被缓存），
+        计数器缺失或 exact=True 时回退为全表 COUNT；有筛选条件时执行走索引的条件 COUNT。
+        筛选参数 include_archived 为 true 时加上归档表中的数量。相同条件的并发统计合并为一次
+
+        Args:
+            session: 异步数据库会话
+            filters: 筛选参数（可选）
+            exact: 是否强制执行全表 COUNT
+
+        Returns:
+            符合条件的 Todo 总数
+        """
+        include_archived = filters is not None and filters.include_archived
+        if filters is not None and filters.filtered:
+            cache_key = ("count", _filter_key(filters))
+            use_cache = not has_uncommitted_writes(session)
+            if use_cache and (cached := todo_cache.get_page(cache_key)) is not None:
+                return cached
+
+            async def load() -> int:
+                total = await session.scalar(_apply_filter(select(func.count(Todo.id)), filters))
+                if include_archived:
+                    stmt = _apply_filter(select(func.count(TodoArchive.id)), filters, TodoArchive.__table__)
+                    total += await session.scalar(stmt)
+                if use_cache:
+                    todo_cache.set_page(cache_key, total, begin_version(session))
+                return total
+
+            return await _single_flight(session, cache_key, load)
+        total = None if exact else await self._read_counter(session, "total")
+        if total is None:
+            total = await _single_flight(session, ("count",), lambda: session.scalar(select(func.count(Todo.id))))
+        if include_archived:
+            archived = None if exact else await self._read_counter(session, "archived")
+            if archived is None:
+                stmt = select(func.count(TodoArchive.id))
+                archived = await _single_flight(session, ("count", "archived"), lambda: session.scalar(stmt))
+            total += archived
+        return total
+
+    async def collection_version(self, session: AsyncSession) -> int:
+        """获取 Todo 集合版本号（任何写操作都会使其递增）
+
+        Args:
+            session: 异步数据库会话
+
+        Returns:
+            当前集合版本号
+        """
+        return await self._read_counter(session, "version") or 0
+
+    async def get_stats(self, session: AsyncSession) -> dict[str, int]:
+        """获取 Todo 统计数据（总数、已完成、未完成、逾期、已归档）
+
+        总数、完成数与逾期数读取随写操作维护的计数器（结果会被缓存），逾期数只统计到逾期统计时间点，
+        之后新到期的未完成 Todo 通过部分索引上的范围 COUNT 补充，该范围由主进程定期推进而保持很小，
+        查询代价与 Todo 总数无关；计数器缺失时回退为全表统计。已归档的 Todo 计入总数与已完成数
+
+        Args:
+            session: 异步数据库会话
+
+        Returns:
+            包含 total、completed、pending、overdue、archived 的字典
+        """
+        now = int(time())
+        counters = await self._read_counters(session, STATS_COUNTERS)
+        if len(counters) < len(STATS_COUNTERS):
+            total, completed, overdue = await self._count_stats(session, until=now)
+            archived = await session.scalar(select(func.count(TodoArchive.id)))
+        else:
+            total, completed, overdue = counters["total"], counters["completed"], counters["overdue"]
+            archived = counters["archived"]
+            if now > counters["overdue_until"]:
+                stmt = select(func.count()).where(
+                    PENDING, Todo.deadline > counters["overdue_until"], Todo.deadline <= now
+                )
+                overdue += await session.scalar(stmt)
+        return {
+            "total": total + archived,
+            "completed": completed + archived,
+            "pending": total - completed,
+            "overdue": overdue,
+            "archived": archived,
+        }
+
+    async def get_changes(self, session: AsyncSession, *, after_seq: int, limit: int = 500) -> list[dict[str, Any]]:
+        """按序号读取变更日志
+
+        每条变更附带对应 Todo 的当前数据（已删除的 Todo 为 None）
+
+        Args:
+            session: 异步数据库会话
+            after_seq: 起始序号（不含）
+            limit: 返回的最大条数
+
+        Returns:
+            按序号升序排列的变更事件列表，每项包含 seq、op、id、ts、data
+        """
+        todo_columns = Todo.__table__.c
+        stmt = (
+            select(
+                TodoChange.seq,
+                TodoChange.op,
+                TodoChange.todo_id,
+                TodoChange.created_at,
+                *(c.label(f"todo__{c.name}") for c in todo_columns),
+            )
+            .outerjoin(Todo, Todo.id == TodoChange.todo_id)
+            .where(TodoChange.seq > after_seq)
+            .order_by(TodoChange.seq)
+            .limit(limit)
+        )
+        events = []
+        for row in (await session.execute(stmt)).mappings():
+            exists = row["todo__id"] is not None and row["op"] != "deleted"
+            events.append(
+                {
+                    "seq": row["seq"],
+                    "op": row["op"],
+                    "id": row["todo_id"],
+                    "ts": row["created_at"],
+                    "data": {c.name: row[f"todo__{c.name}"] for c in todo_columns} if exists else None,
+                }
+            )
+        return events
+
+    async def get_delta(self, session: AsyncSession, *, since: int | None, limit: int = 1000) -> dict[str, Any]:
+        """获取令牌之后的增量变更
+
+        按序号读取变更日志（主键范围查询），代价与变更条数成正比，与 Todo 总数无关；
+        同一 Todo 的多次变更合并为其当前状态：仍存在的返回当前数据，已删除的返回 ID
+
+        Args:
+            session: 异步数据库会话
+            since: 同步令牌（上次同步返回的变更序号，为空时只返回当前令牌）
+            limit: 单次读取的最大变更日志条数
+
+        Returns:
+            包含 items、deleted、next_since、has_more 的字典
+
+        Raises:
+            BizException: 令牌之后的变更日志已被清理或令牌无效时抛出 code=410 的异常
+        """
+        first_seq, last_seq = await self.change_seq_range(session)
+        if since is None:
+            return {"items": [], "deleted": [], "next_since": last_seq, "has_more": False}
+        if since > last_seq or first_seq > since + 1:
+            raise BizException(code=410, msg="同步令牌已过期，请重新全量同步")
+        events = await self.get_changes(session, after_seq=since, limit=limit + 1)
+        has_more = len(events) > limit
+        events = events[:limit]
+        latest: dict[int, dict[str, Any] | None] = {}
+        for event in events:
+            latest.pop(event["id"], None)  # 保持按最后一次变更排序
+            latest[event["id"]] = event["data"]
+        return {
+            "items": [data for data in latest.values() if data is not None],
+            "deleted": [todo_id for todo_id, data in latest.items() if data is None],
+            "next_since": events[-1]["seq"] if events else since,
+            "has_more": has_more,
+        }
+
+    async def change_seq_range(self, session: AsyncSession) -> tuple[int, int]:
+        """获取变更日志中保留的最小与最大序号
+
+        Args:
+            session: 异步数据库会话
+
+        Returns:
+            (最小序号, 最大序号)，日志为空时均为 0
+        """
+        row = (await session.execute(select(func.min(TodoChange.seq), func.max(TodoChange.seq)))).one()
+        return row[0] or 0, row[1] or 0
+
+    async def prune_changes(self, session: AsyncSession, *, before: int, limit: int = 5000) -> int:
+        """清理指定时间之前的变更日志
+
         Args:
             session: 异步数据库会话
+            before: 时间戳，早于该时间的日志被删除
+            limit: 单次最多删除的条数
 
         Returns:
-            数据库中的 Todo 总数
+            实际删除的条数
         """
-        return await session.scalar(select(func.count(Todo.id)))
+        # 始终保留最新一条日志，使日志全部过期后仍能据最小序号判断令牌是否失效
+        latest = select(func.max(TodoChange.seq)).scalar_subquery()
+        expired = (
+            select(TodoChange.seq)
+            .where(TodoChange.created_at < before, TodoChange.seq < latest)
+            .order_by(TodoChange.seq)
+            .limit(limit)
+        )
+        result = await session.execute(delete(TodoChange).where(TodoChange.seq.in_(expired)))
+        return result.rowcount
+
+    async def archive(self, session: AsyncSession, *, before: int, limit: int = 500) -> int:
+        """将最后更新时间早于 before 的已完成 Todo 移入归档表
+
+        以 INSERT ... SELECT 复制后从活跃表删除，并追加 archived 变更（增量同步中表现为从列表中移除）。
+        ID 不会被复用（SQLite 下 todos 表为 AUTOINCREMENT），归档表中的 ID 不会与活跃表冲突
+
+        Args:
+            session: 异步数据库会话
+            before: 时间戳，最后更新时间早于该时间的已完成 Todo 被归档
+            limit: 单次最多归档的条数
+
+        Returns:
+            实际归档的条数
+        """
+        stmt = (
+            select(Todo.id)
+            .where(Todo.completed, Todo.updated_at < before)
+            .order_by(Todo.updated_at)
+            .limit(limit)
+            .with_for_update()
+        )
+        ids = list(await session.scalars(stmt))
+        if not ids:
+            return 0
+        columns = [c.name for c in Todo.__table__.c]
+        rows = select(*Todo.__table__.c, literal(int(time())).label("archived_at")).where(Todo.id.in_(ids))
+        await session.execute(insert(TodoArchive.__table__).from_select([*columns, "archived_at"], rows))
+        await session.execute(delete(Todo.__table__).where(Todo.id.in_(ids)))
+        await self._bump_counter(session, "total", -len(ids))
+        await self._bump_counter(session, "completed", -len(ids))
+        await self._bump_counter(session, "archived", len(ids))
+        await self._changed(session, "archived", ids)
+        return len(ids)
+
+    async def sync_counters(self, session: AsyncSession) -> dict[str, tuple[int | None, int]]:
+        """按实际数据校准计数器
+
+        以一次扫描统计总数、完成数与逾期数，并将逾期统计时间点设为当前时间，另统计归档数；
+        PostgreSQL 下先以 SHARE 模式锁定 todos 表，等待进行中的写事务提交并阻塞新的写入，使统计与计数器一致
+
+        Args:
+            session: 异步数据库会话
+
+        Returns:
+            校准前后不一致的计数器（名称 -> (原值, 新值)），原本缺失的计数器原值为 None
+        """
+        if IS_POSTGRESQL:
+            await session.execute(text(f"LOCK TABLE {Todo.__tablename__} IN SHARE MODE"))
+        now = int(time())
+        total, completed, overdue = await self._count_stats(session, until=now)
+        archived = await session.scalar(select(func.count(TodoArchive.id)))
+        values = {
+            "total": total,
+            "completed": completed,
+            "overdue": overdue,
+            "overdue_until": now,
+            "archived": archived,
+        }
+        stmt = select(TodoCounter.name, TodoCounter.value).where(TodoCounter.name.in_(values))
+        current = dict((await session.execute(stmt)).all())
+        for name, value in values.items():
+            stmt = upsert(TodoCounter).values(name=name, value=value)
+            await session.execute(stmt.on_conflict_do_update(index_elements=[TodoCounter.name], set_={"value": value}))
+        # 版本号以当前时间为起点，避免重建数据库后与客户端缓存的旧 ETag 重复；已存在时保持不变
+        stmt = upsert(TodoCounter).values(name="version", value=now)
+        await session.execute(stmt.on_conflict_do_nothing(index_elements=[TodoCounter.name]))
+        on_commit(session, todo_cache.invalidate)  # 丢弃缓存中校准前的计数器
+        return {
+            name: (current.get(name), value)
+            for name, value in values.items()
+            if name != "overdue_until" and current.get(name) != value
+        }
+
+    async def advance_overdue(self, session: AsyncSession, *, until: int) -> int:
+        """推进逾期统计时间点
+
+        将截止时间在原时间点之后、until 之前（含）的未完成 Todo 计入逾期数（部分索引上的范围 COUNT），
+        代价与新到期的 Todo 数成正比。时间点计数器加排他锁，与写操作读取时间点时的共享锁互斥
+
+        Args:
+            session: 异步数据库会话
+            until: 新的逾期统计时间点
+
+        Returns:
+            新计入的逾期 Todo 数；计数器缺失时执行完整校准并返回 0
+        """
+        stmt = select(TodoCounter.value).where(TodoCounter.name == "overdue_until").with_for_update()
+        current = await session.scalar(stmt)
+        if current is None:
+            await self.sync_counters(session)
+            return 0
+        if until <= current:
+            return 0
+        stmt = select(func.count()).where(PENDING, Todo.deadline > current, Todo.deadline <= until)
+        overdue = await session.scalar(stmt)
+        await session.execute(update(TodoCounter).where(TodoCounter.name == "overdue_until").values(value=until))
+        if overdue:
+            await self._bump_counter(session, "overdue", overdue)
+        return overdue
+
+    async def _read_counter(self, session: AsyncSession, name: str) -> int | None:
+        """读取计数器（结果会被缓存，当前事务中有未提交的写操作时绕过缓存）"""
+        return (await self._read_counters(session, (name,))).get(name)
+
+    async def _read_counters(self, session: AsyncSession, names: tuple[str, ...]) -> dict[str, int]:
+        """以一条查询读取多个计数器（结果会被缓存，当前事务中有未提交的写操作时绕过缓存），缺失的不包含在内"""
+        cache_key = f"counter:{','.join(names)}"
+        use_cache = not has_uncommitted_writes(session)
+        if use_cache and (cached := todo_cache.get_page(cache_key)) is not None:
+            return cached
+
+        async def load() -> dict[str, int]:
+            if len(names) == 1:
+                stmt = select(TodoCounter.name, TodoCounter.value).where(TodoCounter.name == names[0])
+            else:
+                stmt = select(TodoCounter.name, TodoCounter.value).where(TodoCounter.name.in_(names))
+            values = dict((await session.execute(stmt)).all())
+            if use_cache and values:
+                todo_cache.set_page(cache_key, values, begin_version(session))
+            return values
+
+        return await _single_flight(session, ("counter", *names), load)
+
+    async def _count_stats(self, session: AsyncSession, *, until: int) -> tuple[int, int, int]:
+        """以一次全表扫描统计 (总数, 完成数, 截止时间不晚于 until 的未完成数)"""
+        stmt = select(
+            func.count(),
+            func.count().filter(Todo.completed),
+            func.count().filter(PENDING, Todo.deadline <= until),
+        ).select_from(Todo)
+        total, completed, overdue = (await session.execute(stmt)).one()
+        return total, completed, overdue
+
+    async def _adjust_stats_for_update(self, session: AsyncSession, ids: list[int], changes: dict[str, Any]) -> None:
+        """在修改 Todo 之前，以一条 UPDATE 语句按原值与新值调整完成数与逾期数计数器
+
+        原值由语句内的子查询读取（并锁定），不需要额外读取原值的往返；逾期统计时间点同样加共享锁读取，
+        与主进程推进时间点的操作互斥。时间点尚未初始化时逾期数不变，由校准任务补全
+        """
+        old = select(Todo.completed, Todo.deadline).where(Todo.id.in_(ids)).with_for_update().subquery()
+        stmt = select(TodoCounter.value).where(TodoCounter.name == "overdue_until").with_for_update(read=True)
+        until = stmt.scalar_subquery()
+        completed = literal(changes["completed"]) if "completed" in changes else old.c.completed
+        deadline = literal(changes["deadline"], Todo.deadline.type) if "deadline" in changes else old.c.deadline
+
+        def overdue(done: ColumnElement[bool], due: ColumnElement[int]) -> ColumnElement[bool]:
+            return and_(~done, due.is_not(None), due <= until)
+
+        deltas = {
+            "overdue": func.count().filter(overdue(completed, deadline))
+            - func.count().filter(overdue(old.c.completed, old.c.deadline))
+        }
+        if "completed" in changes:
+            deltas["completed"] = func.count().filter(completed) - func.count().filter(old.c.completed)
+        whens = {name: select(delta).select_from(old).scalar_subquery() for name, delta in deltas.items()}
+        stmt = update(TodoCounter).where(TodoCounter.name.in_(deltas))
+        await session.execute(stmt.values(value=TodoCounter.value + case(whens, value=TodoCounter.name)))
+
+    async def _adjust_stats(
+        self,
+        session: AsyncSession,
+        *,
+        before: Iterable[tuple[bool, int | None]] = (),
+        after: Iterable[tuple[bool, int | None]] = (),
+    ) -> None:
+        """按写操作前后各 Todo 的 (是否完成, 截止时间) 在当前事务内调整完成数与逾期数计数器
+
+        逾期数只统计截止时间不晚于逾期统计时间点的未完成 Todo，时间点加共享锁读取，
+        与主进程推进时间点的操作互斥（SQLite 下写事务本身已串行）
+        """
+        before, after = list(before), list(after)
+        completed = sum(done for done, _ in after) - sum(done for done, _ in before)
+        if completed:
+            await self._bump_counter(session, "completed", completed)
+        if not any(not done and deadline is not None for done, deadline in before + after):
+            return
+        stmt = select(TodoCounter.value).where(TodoCounter.name == "overdue_until").with_for_update(read=True)
+        until = await session.scalar(stmt)
+        if until is None:  # 计数器尚未初始化，由校准任务补全
+            return
+        overdue = sum(_is_overdue(*state, until) for state in after) - sum(
+            _is_overdue(*state, until) for state in before
+        )
+        if overdue:
+            await self._bump_counter(session, "overdue", overdue)
+
+    async def _restore(self, session: AsyncSession, ids: list[int]) -> list[int]:
+        """将已归档的 Todo 移回活跃表（由随后的修改操作记录变更），返回移回的 ID"""
+        if not ids:
+            return []
+        columns = [c.name for c in Todo.__table__.c]
+        rows = select(*ARCHIVE_COLUMNS).where(TodoArchive.id.in_(ids))
+        stmt = upsert(Todo.__table__).from_select(columns, rows).on_conflict_do_nothing(index_elements=[Todo.id])
+        restored = (await session.execute(stmt.returning(Todo.id, Todo.completed, Todo.deadline))).all()
+        if not restored:
+            return []
+        restored_ids = [row.id for row in restored]
+        await session.execute(delete(TodoArchive).where(TodoArchive.id.in_(restored_ids)))
+        await self._bump_counter(session, "total", len(restored))
+        await self._bump_counter(session, "archived", -len(restored))
+        await self._adjust_stats(session, after=[(row.completed, row.deadline) for row in restored])
+        return restored_ids
+
+    async def _delete_archived(self, session: AsyncSession, ids: list[int]) -> set[int]:
+        """从归档表删除 Todo（由调用方记录变更），返回实际删除的 ID"""
+        if not ids:
+            return set()
+        result = await session.scalars(delete(TodoArchive).where(TodoArchive.id.in_(ids)).returning(TodoArchive.id))
+        deleted = set(result)
+        await self._bump_counter(session, "archived", -len(deleted))
+        return deleted
+
+    async def _changed(self, session: AsyncSession, op: ChangeOp, todo_ids: Iterable[int]) -> None:
+        """记录一次数据变更：递增集合版本号、追加变更日志，并登记事务提交后的缓存失效与变更推送"""
+        # 版本号计数器的行锁持有至事务提交，存在多个写连接时（PostgreSQL）变更日志序号仍按提交顺序分配
+        await self._bump_counter(session, "version", 1)
+        todo_ids = list(todo_ids)
+        if todo_ids:
+            now = int(time())
+            rows = [{"todo_id": todo_id, "op": op, "created_at": now} for todo_id in todo_ids]
+            await session.execute(insert(TodoChange.__table__), rows)
+        on_commit(session, lambda: todo_cache.invalidate(todo_ids))
+        on_commit(session, change_feed.notify)
+
+    async def _copy_todos(self, session: AsyncSession, todos_in: list[TodoCreate]) -> list[int]:
+        """以 COPY 批量写入 Todo 项（仅 PostgreSQL）
+
+        COPY 不支持 RETURNING，先从 ID 序列一次性分配整批 ID，再连同默认值写入
+        """
+        id_sequence = func.pg_get_serial_sequence(Todo.__tablename__, "id")
+        stmt = select(func.nextval(id_sequence)).select_from(func.generate_series(1, len(todos_in)))
+        ids = list(await session.scalars(stmt))
+        now = int(time())
+        columns = [c.name for c in Todo.__table__.c]
+        records = [
+            tuple(
+                {"completed": False, "created_at": now, "updated_at": now, **todo_in.model_dump(), "id": todo_id}[c]
+                for c in columns
+            )
+            for todo_id, todo_in in zip(ids, todos_in, strict=True)
+        ]
+        connection = await (await session.connection()).get_raw_connection()
+        await connection.driver_connection.copy_records_to_table(Todo.__tablename__, records=records, columns=columns)
+        return ids
+
+    async def _bump_counter(self, session: AsyncSession, name: str, delta: int) -> None:
+        """在当前事务内调整计数器"""
+        stmt = update(TodoCounter).where(TodoCounter.name == name).values(value=TodoCounter.value + delta)
+        await session.execute(stmt)
+
+
+# FTS5 全文索引表（由 models 中的 DDL 创建，仅 SQLite）
+todos_fts = table("todos_fts", column("rowid"))
+
+# trigram 分词最短可匹配 3 个字符，更短的关键字回退为 LIKE
+FTS_MIN_QUERY_LENGTH = 3
+
+# 归档表中与活跃表同名的列（不含归档时间），查询归档表时与活跃表的结果格式一致
+ARCHIVE_COLUMNS = [TodoArchive.__table__.c[c.name] for c in Todo.__table__.c]
+
+# 影响统计计数器的字段
+STATS_FIELDS = {"completed", "deadline"}
+# 统计接口读取的计数器
+STATS_COUNTERS = ("total", "completed", "overdue", "overdue_until", "archived")
+
+# PostgreSQL 下批量写入达到该行数时改用 COPY
+COPY_MIN_ROWS = 100
+
+# 支持 INSERT ... ON CONFLICT 的方言 INSERT 构造
+upsert = postgresql.insert if IS_POSTGRESQL else sqlite.insert
+
+
+async def _single_flight[T](session: AsyncSession, key: tuple, load: Callable[[], Awaitable[T]]) -> T:
+    """合并相同查询的并发调用
+
+    键中包含缓存版本号：写操作提交后（版本号递增）到达的调用不会共享提交前发起的查询；
+    当前事务中有未提交的写操作时单独执行，保证读到本事务自身的写入
+    """
+    if not settings.SINGLE_FLIGHT_ENABLED or has_uncommitted_writes(session):
+        return await load()
+    return await read_flight.do((todo_cache.version, *key), load)
+
+
+def _is_overdue(completed: bool, deadline: int | None, until: int) -> bool:
+    """是否计入逾期数：未完成且截止时间不晚于逾期统计时间点"""
+    return not completed and deadline is not None and deadline <= until
+
+
+def _filter_key(filters: TodoFilter) -> tuple:
+    """筛选参数的缓存键"""
+    return tuple(filters.model_dump().values())
+
+
+def _apply_filter[T: Select](stmt: T, filters: TodoFilter, table: Table = Todo.__table__) -> T:
+    """为查询附加筛选条件（table 为被查询的表，默认为活跃表）"""
+    c = table.c
+    if filters.completed is not None:
+        stmt = stmt.where(c.completed == filters.completed)
+    if filters.deadline_from is not None:
+        stmt = stmt.where(c.deadline >= filters.deadline_from)
+    if filters.deadline_to is not None:
+        stmt = stmt.where(c.deadline <= filters.deadline_to)
+    if filters.q is not None:
+        if IS_SQLITE and table is Todo.__table__ and len(filters.q) >= FTS_MIN_QUERY_LENGTH:
+            phrase = '"' + filters.q.replace('"', '""') + '"'
+            matched = select(todos_fts.c.rowid).where(literal_column("todos_fts").op("MATCH")(phrase))
+            stmt = stmt.where(c.id.in_(matched))
+        else:  # 不区分大小写的子串匹配，与 trigram 分词的匹配规则一致（归档表没有全文索引）
+            stmt = stmt.where(
+                or_(
+                    c.title.icontains(filters.q, autoescape=True),
+                    c.description.icontains(filters.q, autoescape=True),
+                )
+            )
+    return stmt
+
+
+def _order_page[T: Select](stmt: T, c: ColumnCollection, filters: TodoFilter, *, nulls: bool = True) -> T:
+    """按排序参数排序，以 ID 作为次级排序键
+
+    nulls 为 False 时不指定 NULL 的位置（用于排序字段全为 NULL 或全不为 NULL 的游标分段查询），
+    使 PostgreSQL 可以直接按索引顺序读取
+    """
+    sort_column = c[filters.sort]
+    if not nulls:
+        return (
+            stmt.order_by(sort_column.desc(), c.id.desc())
+            if filters.order == "desc"
+            else stmt.order_by(sort_column, c.id)
+        )
+    # 显式指定 NULL 的位置（与 SQLite 默认一致），使游标条件在各数据库下含义相同
+    if filters.order == "desc":
+        return stmt.order_by(sort_column.desc().nulls_last(), c.id.desc())
+    return stmt.order_by(sort_column.asc().nulls_first(), c.id)
+
+
+def _page_query(
+    table: Table, filters: TodoFilter, *, after: tuple[Any, int] | None, limit: int | None = None
+) -> Select:
+    """单张表的分页查询：筛选、排序，并以游标定位起点（查询与活跃表同名的列）"""
+    c = table.c
+    stmt = select(*(c[column.name] for column in Todo.__table__.c))
+    stmt = _order_page(_apply_filter(stmt, filters, table), c, filters)
+    if after is not None:
+        stmt = stmt.where(or_(*_keyset_clauses(table, filters, after)))
+    return stmt if limit is None else stmt.limit(limit)
+
+
+def _keyset_clauses(table: Table, filters: TodoFilter, after: tuple[Any, int] | None) -> list[ColumnElement[bool]]:
+    """生成游标分页的起点条件：按排序先后依次列出位于游标 (排序键, ID) 之后的各段记录的条件
+
+    排序时 NULL 视为小于任何值：升序时排在最前，降序时排在最后（_order_page 中显式指定）。
+    非 NULL 段使用行值比较 (排序字段, ID) > (排序键, ID)，可直接在索引上定位起点；
+    NULL 段单独列出，避免 OR 条件使数据库放弃索引定位
+    """
+    if after is None:
+        return [true()]
+    c = table.c
+    sort_column, (key, todo_id) = c[filters.sort], after
+    desc = filters.order == "desc"
+    if sort_column is c.id:
+        return [c.id < todo_id if desc else c.id > todo_id]
+    if desc:
+        if key is None:
+            return [and_(sort_column.is_(None), c.id < todo_id)]
+        return [tuple_(sort_column, c.id) < tuple_(key, todo_id), sort_column.is_(None)]
+    if key is None:
+        return [and_(sort_column.is_(None), c.id > todo_id), sort_column.is_not(None)]
+    return [tuple_(sort_column, c.id) > tuple_(key, todo_id)]
 
 
 # 创建 TodoCRUD 实例供全局使用
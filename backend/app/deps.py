@@ -1,20 +1,28 @@
 from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from loguru import logger
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import async_session_factory
+from app.core.database import async_session_factory, async_write_session_factory
 from app.core.exception import BizException
+from app.core.writer import SessionWriter, Writer, write_coalescer
 
+# 只读请求方法，使用读引擎的连接池
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
 
-async def get_session() -> AsyncGenerator[AsyncSession]:
+
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession]:
     """
     安全获取数据库会话的依赖项，自动处理事务和异常
+
+    只读请求使用读引擎的连接池，其余请求使用单连接写引擎
     """
-    async with async_session_factory() as session:
+    session_factory = async_session_factory if request.method in READ_METHODS else async_write_session_factory
+    async with session_factory() as session:
         try:
             async with session.begin():
                 yield session
@@ -28,3 +36,24 @@ async def get_session() -> AsyncGenerator[AsyncSession]:
 # 使用示例:
 # async def get_todos(session: session_dep):
 session_dep = Annotated[AsyncSession, Depends(get_session)]
+
+
+async def get_writer(request: Request) -> AsyncGenerator[Writer]:
+    """
+    获取写操作执行器的依赖项
+
+    启用写操作合并时返回全局的合并器（由合并器的批次事务执行，不为请求打开会话），
+    否则打开写会话并在其中直接执行
+    """
+    if write_coalescer.running:
+        yield write_coalescer
+        return
+    async with asynccontextmanager(get_session)(request) as session:
+        yield SessionWriter(session)
+
+
+# writer 依赖项
+# 使用示例:
+# async def create_todo(writer: writer_dep, todo_in: TodoCreate):
+#     todo = await writer.run(todo_crud.create, todo_in=todo_in)
+writer_dep = Annotated[Writer, Depends(get_writer)]
@@ -1,5 +1,6 @@
 from time import time
 
+from sqlalchemy import DDL, Index, event, false
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -15,6 +16,18 @@ class TimestampMixin:
 
 class Todo(Base, TimestampMixin):
     __tablename__ = "todos"
+    __table_args__ = (
+        # 支持按完成状态筛选并按各时间字段排序/范围查询
+        Index("ix_todos_completed_deadline", "completed", "deadline"),
+        Index("ix_todos_completed_created_at", "completed", "created_at"),
+        Index("ix_todos_completed_updated_at", "completed", "updated_at"),
+        # 支持不带筛选条件时按各时间字段排序
+        Index("ix_todos_deadline", "deadline"),
+        Index("ix_todos_created_at", "created_at"),
+        Index("ix_todos_updated_at", "updated_at"),
+        # 已归档或已删除的 ID 不会被新建的 Todo 复用（归档表沿用原 ID）
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(nullable=False)
@@ -24,3 +37,99 @@ class Todo(Base, TimestampMixin):
 
     def __repr__(self) -> str:
         return f"<Todo(id={self.id}, title={self.title}, completed={self.completed})>"
+
+
+# 未完成 Todo 的截止时间部分索引：只收录未完成的行，按截止时间查询与调度到期 Todo 时的代价与已完成的数据量无关
+PENDING = Todo.completed == false()
+Index(
+    "ix_todos_pending_deadline",
+    Todo.deadline,
+    Todo.id,
+    sqlite_where=PENDING,
+    postgresql_where=PENDING,
+)
+
+
+class TodoArchive(Base):
+    """已归档的 Todo
+
+    已完成且长时间未更新的 Todo 由主进程分批从 todos 表移入，保留原 ID 与全部字段，
+    使活跃表只包含工作集；读取单个 Todo 时回退到归档表，修改时移回活跃表
+    """
+
+    __tablename__ = "todos_archive"
+    __table_args__ = (
+        # 支持列表查询包含归档数据时按各时间字段排序
+        Index("ix_todos_archive_deadline", "deadline"),
+        Index("ix_todos_archive_created_at", "created_at"),
+        Index("ix_todos_archive_updated_at", "updated_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)  # 沿用 todos 表中的 ID
+    title: Mapped[str] = mapped_column(nullable=False)
+    description: Mapped[str | None] = mapped_column(nullable=True)
+    completed: Mapped[bool] = mapped_column(default=True)
+    deadline: Mapped[int | None] = mapped_column(nullable=True)
+    created_at: Mapped[int] = mapped_column()
+    updated_at: Mapped[int] = mapped_column()
+    archived_at: Mapped[int] = mapped_column(default=lambda: int(time()))
+
+    def __repr__(self) -> str:
+        return f"<TodoArchive(id={self.id}, title={self.title})>"
+
+
+# SQLite FTS5 全文索引（外部内容表，trigram 分词以支持中文子串搜索），由触发器与 todos 表保持同步
+TODOS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+    "title, description, content='todos', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+]
+for statement in TODOS_FTS_DDL:
+    event.listen(Todo.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Todo.__table__, "after_drop", DDL("DROP TABLE IF EXISTS todos_fts").execute_if(dialect="sqlite"))
+
+
+class TodoCounter(Base):
+    """Todo 计数器
+
+    与 todos 表的写操作在同一事务内维护，列表查询直接读取，避免每次全表 COUNT
+    """
+
+    __tablename__ = "todo_counters"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    value: Mapped[int] = mapped_column(default=0)
+
+    def __repr__(self) -> str:
+        return f"<TodoCounter(name={self.name}, value={self.value})>"
+
+
+class TodoChange(Base):
+    """Todo 变更日志
+
+    与 todos 表的写操作在同一事务内追加，序号单调递增（AUTOINCREMENT 保证序号不会复用），
+    用于变更推送与断线重连后的增量同步
+    """
+
+    __tablename__ = "todo_changes"
+    __table_args__ = (
+        Index("ix_todo_changes_created_at", "created_at"),  # 支持按时间清理过期日志
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(primary_key=True)
+    todo_id: Mapped[int] = mapped_column(nullable=False)
+    op: Mapped[str] = mapped_column(nullable=False)  # created / updated / deleted / archived
+    created_at: Mapped[int] = mapped_column(default=lambda: int(time()))
+
+    def __repr__(self) -> str:
+        return f"<TodoChange(seq={self.seq}, todo_id={self.todo_id}, op={self.op})>"
@@ -1,4 +1,11 @@
-from pydantic import BaseModel, ConfigDict
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from app.core.database import INT_MAX, INT_MIN
+
+# 写入或查询整数列（ID 与时间戳）的输入值，超出列的取值范围时按校验失败处理
+DbInt = Annotated[int, Field(ge=INT_MIN, le=INT_MAX)]
 
 
 class TodoCreate(BaseModel):
@@ -6,7 +13,7 @@ class TodoCreate(BaseModel):
 
     title: str
     description: str | None = None
-    deadline: int | None = None
+    deadline: DbInt | None = None
 
 
 class TodoUpdate(BaseModel):
@@ -15,7 +22,37 @@ class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     completed: bool | None = None
-    deadline: int | None = None
+    deadline: DbInt | None = None
+
+
+class TodoBatchUpdate(TodoUpdate):
+    """Todo 批量更新项"""
+
+    id: DbInt
+
+
+class TodoFilter(BaseModel):
+    """Todo 列表筛选与排序参数"""
+
+    completed: bool | None = Field(None, description="按完成状态筛选")
+    deadline_from: DbInt | None = Field(None, description="截止时间下限（含）")
+    deadline_to: DbInt | None = Field(None, description="截止时间上限（含）")
+    q: str | None = Field(None, max_length=200, description="按标题和描述全文搜索")
+    sort: Literal["id", "deadline", "created_at", "updated_at"] = Field("id", description="排序字段")
+    order: Literal["asc", "desc"] = Field("asc", description="排序方向")
+    include_archived: bool = Field(False, description="是否包含已归档的 Todo")
+
+    @field_validator("q")
+    @classmethod
+    def strip_q(cls, v: str | None) -> str | None:
+        if v is None:
+            return None
+        return v.strip() or None
+
+    @property
+    def filtered(self) -> bool:
+        """是否包含筛选条件（不含排序与是否包含归档）"""
+        return any(v is not None for v in (self.completed, self.deadline_from, self.deadline_to, self.q))
 
 
 class Todo(BaseModel):
@@ -45,7 +82,51 @@ class BaseResponse[DataType](BaseModel):
 class PageResult[ItemType](BaseModel):
     """分页查询结果模型"""
 
-    total: int  # 总记录数
-    page: int  # 当前页码
+    total: int | None = None  # 总记录数（不统计总数时为空）
+    page: int | None = None  # 当前页码（游标分页时为空）
     size: int  # 每页大小
     items: list[ItemType]  # 当前页数据列表
+    next_cursor: str | None = None  # 下一页游标（没有更多数据时为空）
+
+
+class TodoStats(BaseModel):
+    """Todo 统计数据模型"""
+
+    total: int  # 总数（含已归档）
+    completed: int  # 已完成数（含已归档）
+    pending: int  # 未完成数
+    overdue: int  # 逾期数（未完成且截止时间已过）
+    archived: int  # 已归档数
+
+
+class BatchItemResult[ItemType](BaseModel):
+    """批量操作单项结果模型"""
+
+    id: int | None = None  # 对应的 Todo ID
+    code: int = 200  # 单项状态码
+    msg: str = "success"  # 单项提示信息
+    data: ItemType | None = None  # 单项结果数据
+
+
+class ImportRowError(BaseModel):
+    """导入失败的行"""
+
+    line: int  # 行号（从 1 开始，CSV 含表头）
+    msg: str  # 失败原因
+
+
+class ImportResult(BaseModel):
+    """导入结果汇总模型"""
+
+    accepted: int = 0  # 成功导入的记录数
+    rejected: int = 0  # 被拒绝的记录数
+    errors: list[ImportRowError] = []  # 行级错误（最多返回 IMPORT_MAX_ERRORS 条）
+
+
+class DeltaResult[ItemType](BaseModel):
+    """增量同步结果模型"""
+
+    items: list[ItemType]  # 令牌之后创建或更新的 Todo（当前数据）
+    deleted: list[int]  # 令牌之后被删除的 Todo ID
+    next_since: int  # 下次同步使用的令牌
+    has_more: bool  # 是否还有未返回的变更（为 true 时应立即以 next_since 继续同步）
@@ -0,0 +1,7 @@
+"""Todo API 基准测试
+
+在进程内启动应用（临时 SQLite 文件 + ASGI 传输），按场景驱动混合读写负载，
+输出吞吐与延迟百分位的 JSON 报告，并可保存为基线用于对比回归。
+
+用法：python -m benchmarks --help
+"""
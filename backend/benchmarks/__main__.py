@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+import ujson
+
+from benchmarks.runner import SCENARIOS, compare, prepare_environment, run_scenario
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Todo API 基准测试")
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=["mixed"], help="负载场景")
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000, 10000], help="初始数据量（可指定多个）")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发客户端数")
+    parser.add_argument("--duration", type=float, default=10, help="每个场景的测量时长(秒)")
+    parser.add_argument("--warmup", type=float, default=2, help="测量前的预热时长(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--db", type=Path, default=None, help="SQLite 数据库文件路径（默认使用临时目录）")
+    parser.add_argument("--output", type=Path, default=None, help="报告输出文件（默认输出到标准输出）")
+    parser.add_argument("--baseline-dir", type=Path, default=BASELINE_DIR, help="基线目录")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与基线对比，存在退化时以状态码 1 退出")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定退化的相对阈值")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> int:
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    reports = []
+    failed = False
+    for scenario in args.scenario:
+        for rows in args.rows:
+            print(f"运行场景 {scenario}（{rows} 行，并发 {args.concurrency}）...", file=sys.stderr)
+            report = await run_scenario(
+                scenario,
+                rows=rows,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+                seed_value=args.seed,
+            )
+            reports.append(report)
+            baseline_path = args.baseline_dir / f"{scenario}-{rows}-c{args.concurrency}.json"
+            if args.compare:
+                if baseline_path.exists():
+                    regressions = compare(report, ujson.loads(baseline_path.read_text()), threshold=args.threshold)
+                    report["regressions"] = regressions
+                    for regression in regressions:
+                        print(f"[退化] {scenario}/{rows}: {regression}", file=sys.stderr)
+                    failed = failed or bool(regressions)
+                else:
+                    print(f"[跳过对比] 基线不存在: {baseline_path}", file=sys.stderr)
+            if args.save_baseline:
+                args.baseline_dir.mkdir(parents=True, exist_ok=True)
+                baseline_path.write_text(ujson.dumps(report, indent=2, ensure_ascii=False) + "\n")
+
+    output = ujson.dumps(reports, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    prepare_environment(arguments.db)  # 必须在导入应用之前完成
+    sys.exit(asyncio.run(main(arguments)))
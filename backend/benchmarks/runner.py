@@ -0,0 +1,231 @@
+import asyncio
+import os
+import platform
+import random
+import tempfile
+from dataclasses import dataclass, field
+from importlib.metadata import version
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+# 各场景中操作的权重
+SCENARIOS: dict[str, dict[str, int]] = {
+    "mixed": {"read_todo": 50, "read_todos": 20, "create": 10, "update": 15, "delete": 5},
+    "read": {"read_todo": 70, "read_todos": 30},
+    "write": {"create": 40, "update": 40, "delete": 20},
+    "deep_page": {"read_todos": 100},
+}
+
+# 记录在报告中的配置项，便于对比不同配置下的结果
+REPORTED_SETTINGS = [
+    "DB_POOL_SIZE",
+    "DB_MAX_OVERFLOW",
+    "DB_SPLIT_READ_WRITE",
+    "SQLITE_JOURNAL_MODE",
+    "SQLITE_SYNCHRONOUS",
+    "FAST_JSON_RESPONSE",
+    "CACHE_ENABLED",
+    "WRITE_COALESCING",
+]
+
+PAGE_SIZE = 10
+
+
+def prepare_environment(db_path: Path | None = None) -> Path:
+    """在导入应用之前设置环境变量：使用临时 SQLite 文件，并为必需配置提供默认值"""
+    if db_path is None:
+        db_path = Path(tempfile.mkdtemp(prefix="todo-bench-")) / "bench.sqlite3"
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("APP_ENV", "testing")
+    os.environ.setdefault("DB_RESET_ON_START", "true")  # 每个场景启动时重建数据表
+    return db_path
+
+
+@dataclass
+class OpStats:
+    """单类操作的延迟样本"""
+
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self) -> dict[str, Any]:
+        samples = sorted(self.latencies)
+        return {
+            "count": len(samples),
+            "errors": self.errors,
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else None,
+            "p50_ms": percentile(samples, 50),
+            "p90_ms": percentile(samples, 90),
+            "p99_ms": percentile(samples, 99),
+            "max_ms": round(samples[-1] * 1000, 3) if samples else None,
+        }
+
+
+def percentile(samples: list[float], p: float) -> float | None:
+    """已排序样本的百分位数（毫秒，最近秩法）"""
+    if not samples:
+        return None
+    index = max(0, min(len(samples) - 1, round(p / 100 * len(samples) + 0.5) - 1))
+    return round(samples[index] * 1000, 3)
+
+
+class Workload:
+    """按权重随机执行 Todo API 操作
+
+    维护当前存在的 Todo ID 列表，使读取、更新、删除都命中存在的记录
+    """
+
+    def __init__(self, client, ids: list[int], weights: dict[str, int], rng: random.Random):
+        self.client = client
+        self.ids = ids
+        self.rng = rng
+        self.ops = list(weights)
+        self.weights = list(weights.values())
+        self.stats = {op: OpStats() for op in self.ops}
+
+    async def step(self):
+        op = self.rng.choices(self.ops, self.weights)[0]
+        started = perf_counter()
+        ok = await getattr(self, op)()
+        elapsed = perf_counter() - started
+        self.stats[op].latencies.append(elapsed)
+        if not ok:
+            self.stats[op].errors += 1
+
+    async def _call(self, method: str, url: str, **kwargs) -> dict[str, Any] | None:
+        response = await self.client.request(method, url, **kwargs)
+        if response.status_code != 200:
+            return None
+        body = response.json()
+        return body if body["code"] < 400 else None
+
+    async def create(self) -> bool:
+        body = await self._call("POST", "/api/todos/", json={"title": f"bench {self.rng.random()}"})
+        if body is None:
+            return False
+        self.ids.append(body["data"]["id"])
+        return True
+
+    async def read_todo(self) -> bool:
+        if not self.ids:
+            return True
+        return await self._call("GET", f"/api/todos/{self.rng.choice(self.ids)}") is not None
+
+    async def read_todos(self) -> bool:
+        """读取最后 10% 范围内的随机深页（偏移分页）"""
+        pages = max(1, len(self.ids) // PAGE_SIZE)
+        page = self.rng.randint(max(1, pages - pages // 10), pages)
+        return await self._call("GET", "/api/todos/", params={"page": page, "size": PAGE_SIZE}) is not None
+
+    async def update(self) -> bool:
+        if not self.ids:
+            return True
+        todo_id = self.rng.choice(self.ids)
+        payload = {"completed": self.rng.random() < 0.5, "title": f"updated {self.rng.random()}"}
+        return await self._call("PUT", f"/api/todos/{todo_id}", json=payload) is not None
+
+    async def delete(self) -> bool:
+        if not self.ids:
+            return True
+        index = self.rng.randrange(len(self.ids))
+        self.ids[index], self.ids[-1] = self.ids[-1], self.ids[index]
+        return await self._call("DELETE", f"/api/todos/{self.ids.pop()}") is not None
+
+
+async def seed(rows: int, chunk_size: int = 10000) -> list[int]:
+    """直接通过 CRUD 批量写入初始数据（不经过 HTTP），返回写入的 ID 列表"""
+    from app.core.cache import todo_cache
+    from app.core.database import async_write_session_factory
+    from app.crud import todo_crud
+    from app.schemas import TodoCreate
+
+    ids: list[int] = []
+    async with async_write_session_factory.begin() as session:
+        for start in range(0, rows, chunk_size):
+            chunk = [
+                TodoCreate(title=f"seed {i}", description=f"benchmark row {i}", deadline=1_700_000_000 + i)
+                for i in range(start, min(rows, start + chunk_size))
+            ]
+            ids.extend(await todo_crud.insert_many(session, todos_in=chunk))
+    todo_cache.backend.clear()
+    return ids
+
+
+async def run_scenario(
+    scenario: str,
+    *,
+    rows: int,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed_value: int = 0,
+) -> dict[str, Any]:
+    """在进程内启动应用，写入 rows 条初始数据后以指定并发执行场景，返回 JSON 报告"""
+    from httpx import ASGITransport, AsyncClient
+
+    from app import create_app
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        seed_started = perf_counter()
+        ids = await seed(rows)
+        seed_seconds = perf_counter() - seed_started
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url=f"http://{settings.HOST}") as client:
+            rng = random.Random(seed_value)
+            workload = Workload(client, ids, SCENARIOS[scenario], rng)
+
+            async def drive(until: float):
+                while perf_counter() < until:
+                    await workload.step()
+
+            if warmup > 0:
+                await asyncio.gather(*(drive(perf_counter() + warmup) for _ in range(concurrency)))
+                workload.stats = {op: OpStats() for op in workload.ops}
+
+            started = perf_counter()
+            await asyncio.gather(*(drive(started + duration) for _ in range(concurrency)))
+            elapsed = perf_counter() - started
+
+    total = OpStats()
+    for stats in workload.stats.values():
+        total.latencies.extend(stats.latencies)
+        total.errors += stats.errors
+    overall = total.summary()
+    return {
+        "scenario": scenario,
+        "rows": rows,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "seed_s": round(seed_seconds, 3),
+        "requests": overall["count"],
+        "errors": overall["errors"],
+        "throughput_rps": round(overall["count"] / elapsed, 1),
+        "latency": overall,
+        "ops": {op: stats.summary() for op, stats in workload.stats.items()},
+        "settings": {name: getattr(settings, name) for name in REPORTED_SETTINGS},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **{package: version(package) for package in ("fastapi", "sqlalchemy", "aiosqlite", "pydantic")},
+        },
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], *, threshold: float) -> list[str]:
+    """与基线对比，返回超过阈值的退化项（吞吐下降或 p99 延迟上升）"""
+    regressions = []
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - threshold):
+        regressions.append(f"吞吐 {baseline['throughput_rps']} -> {report['throughput_rps']} req/s")
+    for op, stats in report["ops"].items():
+        base = baseline["ops"].get(op)
+        if not base or base["p99_ms"] is None or stats["p99_ms"] is None:
+            continue
+        if stats["p99_ms"] > base["p99_ms"] * (1 + threshold):
+            regressions.append(f"{op} p99 {base['p99_ms']} -> {stats['p99_ms']} ms")
+    return regressions
@@ -0,0 +1,55 @@
+"""测试配置
+
+默认使用临时目录中的 SQLite 数据库；设置 TEST_DATABASE_URI 时使用指定的数据库（如 PostgreSQL），
+测试开始时会删除并重建其中的全部表。环境变量必须在导入应用之前设置
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+_data_dir = Path(tempfile.mkdtemp(prefix="todo-test-"))
+os.environ["DATA_DIR"] = str(_data_dir)
+os.environ["SQLALCHEMY_DATABASE_URI"] = (
+    os.environ.get("TEST_DATABASE_URI") or f"sqlite+aiosqlite:///{_data_dir / 'test.sqlite3'}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["APP_ENV"] = "testing"
+os.environ["DB_RESET_ON_START"] = "true"
+
+import pytest  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from app.core.database import IS_POSTGRESQL, IS_SQLITE, async_write_session_factory  # noqa: E402
+
+requires_sqlite = pytest.mark.skipif(not IS_SQLITE, reason="仅 SQLite")
+requires_postgresql = pytest.mark.skipif(not IS_POSTGRESQL, reason="仅 PostgreSQL（设置 TEST_DATABASE_URI）")
+
+
+@pytest.fixture(scope="session")
+async def app():
+    """在进程内启动应用（整个测试会话共用）"""
+    from app import create_app
+
+    application = create_app()
+    async with application.router.lifespan_context(application):
+        yield application
+
+
+@pytest.fixture
+async def client(app):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost") as c:
+        yield c
+
+
+@pytest.fixture(autouse=True)
+async def clean_tables(app):  # noqa: ARG001
+    """每个测试开始前清空 Todo 数据（保留变更日志），并校准计数器"""
+    from app.crud import todo_crud
+    from app.models import Todo, TodoArchive
+
+    async with async_write_session_factory.begin() as session:
+        await session.execute(delete(Todo))
+        await session.execute(delete(TodoArchive))
+        await todo_crud.sync_counters(session)
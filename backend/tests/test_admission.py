@@ -0,0 +1,52 @@
+"""准入控制：达到上限后有界排队，队列已满或等待超时时快速返回 503"""
+
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionLimiter
+from app.core.config import get_settings
+from app.core.database import async_engine
+from app.core.exception import BizException
+
+settings = get_settings()
+
+
+async def test_limiter_queues_then_sheds_load():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=1, timeout=0.05)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.waiting == 1
+
+    with pytest.raises(BizException) as exc_info:  # 队列已满
+        await limiter.acquire()
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == str(settings.ADMISSION_RETRY_AFTER)
+
+    limiter.release()
+    await waiter  # 排队的请求获得名额
+    with pytest.raises(BizException):  # 等待超时
+        await limiter.acquire()
+    limiter.release()
+    assert (limiter.in_flight, limiter.waiting) == (0, 0)
+
+
+async def test_reader_pool_limit_matches_capacity():
+    pool = async_engine.pool
+    assert pool.limiter.limit == pool.size() + pool._max_overflow
+
+
+async def test_exhausted_reader_pool_returns_503(client):
+    limiter = async_engine.pool.limiter
+    held = limiter.limit - limiter.in_flight
+    for _ in range(held):
+        await limiter.acquire()
+    timeout, limiter.timeout = limiter.timeout, 0.01
+    try:
+        r = await client.get("/api/todos/stats")
+    finally:
+        limiter.timeout = timeout
+        for _ in range(held):
+            limiter.release()
+    assert r.status_code == 503 and r.headers["Retry-After"]
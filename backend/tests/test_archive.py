@@ -0,0 +1,92 @@
+"""归档：已完成的旧 Todo 移入归档表后仍可读取、修改与删除"""
+
+from time import time
+
+from app.core.database import async_write_session_factory
+from app.crud import todo_crud
+
+
+async def _archive() -> int:
+    async with async_write_session_factory.begin() as session:
+        return await todo_crud.archive(session, before=int(time()) + 1)
+
+
+async def _create(client, *titles: str) -> list[int]:
+    r = await client.post("/api/todos/batch", json=[{"title": title} for title in titles])
+    return [item["id"] for item in r.json()["data"]]
+
+
+async def test_archived_todo_is_readable_and_listed_on_request(client):
+    a, b, c = await _create(client, "a", "b", "c")
+    await client.patch("/api/todos/batch", json=[{"id": a, "completed": True}, {"id": b, "completed": True}])
+    assert await _archive() >= 1
+
+    r = await client.get(f"/api/todos/{a}")
+    assert r.json()["data"]["title"] == "a"
+    listed = [item["id"] for item in (await client.get("/api/todos/")).json()["data"]["items"]]
+    assert a not in listed and c in listed
+    r = await client.get("/api/todos/", params={"include_archived": True})
+    assert [item["id"] for item in r.json()["data"]["items"]] == [a, b, c]
+    assert r.json()["data"]["total"] == 3
+
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert stats["total"] == 3 and stats["completed"] == 2 and stats["archived"] >= 1
+
+
+async def test_update_restores_archived_todo(client):
+    a, _ = await _create(client, "a", "b")
+    await client.put(f"/api/todos/{a}", json={"completed": True})
+    await _archive()
+
+    r = await client.put(f"/api/todos/{a}", json={"completed": False})
+    assert r.json()["data"]["completed"] is False
+    listed = [item["id"] for item in (await client.get("/api/todos/")).json()["data"]["items"]]
+    assert a in listed
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert (stats["archived"], stats["completed"], stats["pending"]) == (0, 0, 2)
+
+
+async def test_delete_archived_todo(client):
+    a, _ = await _create(client, "a", "b")
+    await client.put(f"/api/todos/{a}", json={"completed": True})
+    await _archive()
+
+    assert (await client.delete(f"/api/todos/{a}")).json()["code"] == 204
+    assert (await client.get(f"/api/todos/{a}")).json()["code"] == 404
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert (stats["total"], stats["archived"]) == (1, 0)
+
+
+async def test_archive_appears_in_delta_as_deleted(client):
+    a, _ = await _create(client, "a", "b")
+    await client.put(f"/api/todos/{a}", json={"completed": True})
+    token = (await client.get("/api/todos/changes")).json()["data"]["next_since"]
+    await _archive()
+
+    delta = (await client.get("/api/todos/changes", params={"since": token})).json()["data"]
+    assert delta["deleted"] == [a]
+
+
+async def test_archived_ids_are_not_reused(client):
+    a, b, c = await _create(client, "a", "b", "c")
+    await client.patch("/api/todos/batch", json=[{"id": a, "completed": True}, {"id": b, "completed": True}])
+    assert await _archive() == 2
+    await client.delete(f"/api/todos/{c}")
+
+    (d,) = await _create(client, "d")
+    assert d > c
+    assert (await client.get(f"/api/todos/{a}")).json()["data"]["title"] == "a"
+
+
+async def test_empty_update_returns_archived_todo(client):
+    """没有修改内容时与读取相同返回归档的数据，不移回活跃表"""
+    a, _ = await _create(client, "a", "b")
+    await client.put(f"/api/todos/{a}", json={"completed": True})
+    await _archive()
+
+    r = await client.put(f"/api/todos/{a}", json={})
+    assert r.json()["code"] == 200 and r.json()["data"]["title"] == "a"
+    r = await client.patch("/api/todos/batch", json=[{"id": a}])
+    assert [item["code"] for item in r.json()["data"]] == [200]
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert stats["archived"] == 1
@@ -0,0 +1,51 @@
+"""批量接口：逐项结果、不存在的 ID 与事务语义"""
+
+
+async def test_batch_create_returns_items_in_order(client):
+    r = await client.post("/api/todos/batch", json=[{"title": "a"}, {"title": "b", "deadline": 100}])
+    body = r.json()
+    assert body["code"] == 201
+    assert [item["data"]["title"] for item in body["data"]] == ["a", "b"]
+    assert [item["code"] for item in body["data"]] == [201, 201]
+    ids = [item["id"] for item in body["data"]]
+    assert ids == sorted(ids)
+
+
+async def test_batch_update_reports_missing_ids(client):
+    r = await client.post("/api/todos/batch", json=[{"title": "a"}, {"title": "b"}, {"title": "c"}])
+    a, b, c = (item["id"] for item in r.json()["data"])
+    r = await client.patch(
+        "/api/todos/batch",
+        json=[
+            {"id": a, "completed": True},
+            {"id": 10**9, "completed": True},
+            {"id": b, "completed": True},  # 与第一项的修改内容相同，合并为一条语句
+            {"id": c, "title": "c2"},
+        ],
+    )
+    results = r.json()["data"]
+    assert [item["code"] for item in results] == [200, 404, 200, 200]
+    assert results[0]["data"]["completed"] and results[2]["data"]["completed"]
+    assert results[3]["data"]["title"] == "c2"
+
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert (stats["total"], stats["completed"], stats["pending"]) == (3, 2, 1)
+
+
+async def test_batch_delete_reports_missing_ids(client):
+    r = await client.post("/api/todos/batch", json=[{"title": "a"}, {"title": "b"}])
+    a, b = (item["id"] for item in r.json()["data"])
+    r = await client.request("DELETE", "/api/todos/batch", json={"ids": [a, 10**9, b]})
+    assert [item["code"] for item in r.json()["data"]] == [204, 404, 204]
+    assert (await client.get(f"/api/todos/{a}")).json()["code"] == 404
+
+
+async def test_batch_rejects_empty_body(client):
+    r = await client.post("/api/todos/batch", json=[])
+    assert r.status_code == 422
+
+
+async def test_batch_create_is_atomic(client):
+    r = await client.post("/api/todos/batch", json=[{"title": "a"}, {"description": "缺少标题"}])
+    assert r.status_code == 422
+    assert (await client.get("/api/todos/stats")).json()["data"]["total"] == 0
@@ -0,0 +1,43 @@
+"""读缓存：写操作提交后不返回旧数据"""
+
+from sqlalchemy import func, select
+
+from app.core.database import async_session_factory, async_write_session_factory
+from app.crud import todo_crud
+from app.models import Todo
+from app.schemas import TodoFilter, TodoUpdate
+
+
+async def _rename(todo_id: int, title: str):
+    async with async_write_session_factory.begin() as session:
+        await todo_crud.update(session, todo_id=todo_id, todo_in=TodoUpdate(title=title))
+
+
+async def test_write_invalidates_cached_item_and_pages(client):
+    todo_id = (await client.post("/api/todos/", json={"title": "a"})).json()["data"]["id"]
+    assert (await client.get(f"/api/todos/{todo_id}")).json()["data"]["title"] == "a"
+    assert (await client.get("/api/todos/")).json()["data"]["items"][0]["title"] == "a"
+
+    await client.put(f"/api/todos/{todo_id}", json={"title": "b"})
+    assert (await client.get(f"/api/todos/{todo_id}")).json()["data"]["title"] == "b"
+    assert (await client.get("/api/todos/")).json()["data"]["items"][0]["title"] == "b"
+
+
+async def test_read_begun_before_commit_does_not_fill_cache(client):
+    """事务在写操作提交前开始、提交后才读取时，读到的旧快照不得以提交后的版本号写入缓存"""
+    todo_id = (await client.post("/api/todos/", json={"title": "old"})).json()["data"]["id"]
+    filters = TodoFilter()
+    async with async_session_factory() as session, session.begin():
+        await session.execute(select(func.count(Todo.id)))  # 开始读事务（SQLite 下建立快照）
+        await _rename(todo_id, "new")
+        await todo_crud.get(session, todo_id=todo_id)
+        await todo_crud.get_multi(session, filters=filters)
+        await todo_crud.count(session, filters=TodoFilter(q="old"))
+        await todo_crud.collection_version(session)
+
+    async with async_session_factory() as session, session.begin():
+        assert (await todo_crud.get(session, todo_id=todo_id))["title"] == "new"
+        assert (await todo_crud.get_multi(session, filters=filters))[0]["title"] == "new"
+        assert await todo_crud.count(session, filters=TodoFilter(q="old")) == 0
+    r = await client.get("/api/todos/")
+    assert r.json()["data"]["items"][0]["title"] == "new"
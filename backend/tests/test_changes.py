@@ -0,0 +1,38 @@
+"""增量同步：令牌之后的变更合并为当前状态"""
+
+
+async def test_delta_sync_merges_changes(client):
+    r = await client.get("/api/todos/changes")
+    token = r.json()["data"]["next_since"]
+
+    r = await client.post("/api/todos/batch", json=[{"title": "a"}, {"title": "b"}])
+    a, b = (item["id"] for item in r.json()["data"])
+    await client.put(f"/api/todos/{a}", json={"title": "a2"})
+    await client.delete(f"/api/todos/{b}")
+
+    delta = (await client.get("/api/todos/changes", params={"since": token})).json()["data"]
+    assert [item["id"] for item in delta["items"]] == [a]
+    assert delta["items"][0]["title"] == "a2"
+    assert delta["deleted"] == [b]
+    assert not delta["has_more"]
+
+    delta = (await client.get("/api/todos/changes", params={"since": delta["next_since"]})).json()["data"]
+    assert delta["items"] == [] and delta["deleted"] == []
+
+
+async def test_delta_sync_pages_with_has_more(client):
+    token = (await client.get("/api/todos/changes")).json()["data"]["next_since"]
+    await client.post("/api/todos/batch", json=[{"title": str(i)} for i in range(5)])
+
+    seen, has_more = [], True
+    while has_more:
+        delta = (await client.get("/api/todos/changes", params={"since": token, "limit": 2})).json()["data"]
+        seen += [item["title"] for item in delta["items"]]
+        token, has_more = delta["next_since"], delta["has_more"]
+    assert seen == [str(i) for i in range(5)]
+
+
+async def test_delta_sync_rejects_future_token(client):
+    token = (await client.get("/api/todos/changes")).json()["data"]["next_since"]
+    r = await client.get("/api/todos/changes", params={"since": token + 100})
+    assert r.json()["code"] == 410
@@ -0,0 +1,71 @@
+"""多进程协调：文件锁主进程选举，其他进程的写入经变更日志失效本进程的读缓存"""
+
+import asyncio
+import sqlite3
+from time import time
+
+from sqlalchemy.engine import make_url
+
+from app.core.cache import todo_cache
+from app.core.config import get_settings
+from app.core.coordination import LeaderElection
+from app.core.events import change_feed
+from tests.conftest import requires_sqlite
+
+settings = get_settings()
+
+
+async def test_single_leader_and_takeover(tmp_path):
+    first = LeaderElection(tmp_path / "leader.lock", retry_interval=0.02)
+    second = LeaderElection(tmp_path / "leader.lock", retry_interval=0.02)
+    await first.start()
+    await second.start()
+    try:
+        assert first.is_leader and not second.is_leader
+        await asyncio.sleep(0.1)
+        assert not second.is_leader and second.running
+
+        await first.stop()
+        assert not first.is_leader
+        for _ in range(50):
+            if second.is_leader:
+                break
+            await asyncio.sleep(0.02)
+        assert second.is_leader and not second.running
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+@requires_sqlite
+async def test_external_write_invalidates_cache(client, monkeypatch):
+    """其他进程直接写库后，本进程经 data_version 检测到提交，拉取变更日志并失效缓存"""
+    since = change_feed.last_seq
+    todo_id = (await client.post("/api/todos/", json={"title": "a"})).json()["data"]["id"]
+    while change_feed.last_seq == since:  # 等本进程的写入事件拉取完毕，避免其失效随后写入的缓存
+        await asyncio.sleep(0.01)
+    monkeypatch.setattr(settings, "WORKERS", 2)
+    await client.get(f"/api/todos/{todo_id}")
+    assert todo_cache.get_item(todo_id)["title"] == "a"
+
+    watcher = asyncio.create_task(change_feed._watch())
+    try:
+        await asyncio.sleep(0.2)  # 等待检测连接读取初始 data_version
+        # 模拟其他进程的写事务：修改 Todo 并追加变更日志
+        connection = sqlite3.connect(make_url(settings.SQLALCHEMY_DATABASE_URI).database)
+        with connection:
+            connection.execute("UPDATE todos SET title = 'b' WHERE id = ?", (todo_id,))
+            connection.execute(
+                "INSERT INTO todo_changes (todo_id, op, created_at) VALUES (?, 'updated', ?)",
+                (todo_id, int(time())),
+            )
+        connection.close()
+
+        for _ in range(100):
+            if todo_cache.get_item(todo_id) is None:
+                break
+            await asyncio.sleep(0.02)
+        assert (await client.get(f"/api/todos/{todo_id}")).json()["data"]["title"] == "b"
+    finally:
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
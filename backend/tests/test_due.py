@@ -0,0 +1,61 @@
+"""到期提醒：/due 接口按截止时间分页返回未完成的到期 Todo，调度器对每个到期 Todo 只通知一次"""
+
+import asyncio
+from time import time
+
+from app.core.scheduler import DueScheduler
+
+
+async def create(client, title, deadline) -> int:
+    return (await client.post("/api/todos/", json={"title": title, "deadline": deadline})).json()["data"]["id"]
+
+
+async def test_due_lists_pending_todos_by_deadline(client):
+    now = int(time())
+    late = await create(client, "c", 300)
+    early = await create(client, "a", 100)
+    middle = await create(client, "b", 200)
+    done = await create(client, "done", 150)
+    await client.put(f"/api/todos/{done}", json={"completed": True})
+    await create(client, "future", now + 3600)
+    await create(client, "no deadline", None)
+
+    r = await client.get("/api/todos/due", params={"size": 2})
+    data = r.json()["data"]
+    assert [todo["id"] for todo in data["items"]] == [early, middle]
+    assert data["total"] is None and data["next_cursor"]
+
+    r = await client.get("/api/todos/due", params={"size": 2, "cursor": data["next_cursor"]})
+    data = r.json()["data"]
+    assert [todo["id"] for todo in data["items"]] == [late]
+    assert data["next_cursor"] is None
+
+    r = await client.get("/api/todos/due", params={"before": 150})
+    assert [todo["id"] for todo in r.json()["data"]["items"]] == [early]
+
+
+async def test_scheduler_notifies_each_due_todo_once(client):
+    notified = []
+    # window=1：已加载的一条到期后才加载下一条，同时覆盖分批加载
+    scheduler = DueScheduler(hook=notified.extend, window=1, tick=0.05)
+    soon = int(time()) + 1
+    loaded = await create(client, "a", soon)
+    await scheduler.start()
+    try:
+        created = await create(client, "b", soon)
+        completed = await create(client, "c", soon)
+        await client.put(f"/api/todos/{completed}", json={"completed": True})
+        postponed = await create(client, "d", soon)
+        await client.put(f"/api/todos/{postponed}", json={"deadline": soon + 3600})
+        await create(client, "e", soon + 3600)
+
+        for _ in range(100):
+            if len(notified) >= 2:
+                break
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.3)  # 留出时间暴露重复或多余的通知
+        assert [todo["id"] for todo in notified] == [loaded, created]
+        assert notified[0]["title"] == "a"
+    finally:
+        await scheduler.stop()
+    assert not scheduler.running
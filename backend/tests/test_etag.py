@@ -0,0 +1,27 @@
+"""条件请求：ETag 随每次修改变化"""
+
+
+async def test_unchanged_todo_returns_304(client):
+    todo_id = (await client.post("/api/todos/", json={"title": "a"})).json()["data"]["id"]
+    r = await client.get(f"/api/todos/{todo_id}")
+    etag = r.headers["ETag"]
+    r = await client.get(f"/api/todos/{todo_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.headers["ETag"] == etag
+
+
+async def test_same_second_update_changes_etag(client):
+    """同一秒内的修改不改变更新时间，ETag 仍须变化，否则客户端会得到过期的 304"""
+    todo_id = (await client.post("/api/todos/", json={"title": "a"})).json()["data"]["id"]
+    etag = (await client.get(f"/api/todos/{todo_id}")).headers["ETag"]
+    await client.put(f"/api/todos/{todo_id}", json={"title": "b"})
+
+    r = await client.get(f"/api/todos/{todo_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["data"]["title"] == "b" and r.headers["ETag"] != etag
+
+
+async def test_collection_etag_changes_on_write(client):
+    etag = (await client.get("/api/todos/")).headers["ETag"]
+    assert (await client.get("/api/todos/", headers={"If-None-Match": etag})).status_code == 304
+    await client.post("/api/todos/", json={"title": "a"})
+    assert (await client.get("/api/todos/", headers={"If-None-Match": etag})).status_code == 200
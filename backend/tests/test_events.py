@@ -0,0 +1,81 @@
+"""变更推送：订阅者收到已提交的变更，WebSocket 推送与跨进程写入检测"""
+
+import asyncio
+import sqlite3
+
+import ujson
+from sqlalchemy.engine import make_url
+
+from app.core.config import get_settings
+from app.core.database import async_engine
+from app.core.events import change_feed
+from tests.conftest import requires_sqlite
+
+settings = get_settings()
+
+
+@requires_sqlite
+async def test_watcher_uses_dedicated_connection(monkeypatch):
+    notified = asyncio.Event()
+    monkeypatch.setattr(change_feed, "notify", notified.set)
+    checked_out = async_engine.pool.checkedout()
+    task = asyncio.create_task(change_feed._watch())
+    try:
+        await asyncio.sleep(0.2)
+        assert async_engine.pool.checkedout() == checked_out
+
+        # 模拟其他进程提交的写事务
+        connection = sqlite3.connect(make_url(settings.SQLALCHEMY_DATABASE_URI).database)
+        connection.execute("UPDATE todo_counters SET value = value + 1 WHERE name = 'version'")
+        connection.commit()
+        connection.close()
+        await asyncio.wait_for(notified.wait(), 2)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def test_subscriber_receives_committed_changes(client):
+    since = change_feed.last_seq
+    events = []
+
+    async def consume():
+        async for batch in change_feed.subscribe(since, heartbeat=0.05):
+            events.extend(batch)
+            if events:
+                return
+
+    consumer = asyncio.create_task(consume())
+    r = await client.post("/api/todos/", json={"title": "a"})
+    await asyncio.wait_for(consumer, 2)
+    assert events[0]["op"] == "created" and events[0]["id"] == r.json()["data"]["id"]
+
+
+async def test_websocket_ignores_client_messages(app, client):
+    """客户端发送的消息（如应用层心跳）不会结束推送，只有断开连接才会"""
+    incoming: asyncio.Queue = asyncio.Queue()
+    sent: asyncio.Queue = asyncio.Queue()
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0"},
+        "scheme": "ws",
+        "path": "/api/todos/events",
+        "raw_path": b"/api/todos/events",
+        "query_string": f"since={change_feed.last_seq}".encode(),
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1),
+        "server": ("localhost", 80),
+        "subprotocols": [],
+    }
+    await incoming.put({"type": "websocket.connect"})
+    session = asyncio.create_task(app(scope, incoming.get, sent.put))
+    assert (await asyncio.wait_for(sent.get(), 2))["type"] == "websocket.accept"
+
+    await incoming.put({"type": "websocket.receive", "text": "ping"})
+    await asyncio.sleep(0.05)
+    r = await client.post("/api/todos/", json={"title": "a"})
+    message = await asyncio.wait_for(sent.get(), 2)
+    assert ujson.loads(message["text"])[0]["id"] == r.json()["data"]["id"]
+
+    await incoming.put({"type": "websocket.disconnect", "code": 1000})
+    await asyncio.wait_for(session, 2)
@@ -0,0 +1,38 @@
+"""快速 JSON 响应：输出须与经响应模型序列化的常规路径逐字节一致"""
+
+import pytest
+
+from app.api.routes import todos
+
+
+@pytest.mark.parametrize("path", ["/api/todos/{id}", "/api/todos/", "/api/todos/stats", "/api/todos/due?before=2000"])
+async def test_fast_json_matches_model_response(client, monkeypatch, path):
+    await client.post("/api/todos/", json={"title": '中文/斜杠 "引号"', "description": None, "deadline": 1000})
+    todo_id = (await client.post("/api/todos/", json={"title": "b", "description": "x\ny"})).json()["data"]["id"]
+    url = path.format(id=todo_id)
+
+    monkeypatch.setattr(todos.settings, "FAST_JSON_RESPONSE", False)
+    slow = await client.get(url)
+    monkeypatch.setattr(todos.settings, "FAST_JSON_RESPONSE", True)
+    fast = await client.get(url)
+
+    assert fast.status_code == slow.status_code == 200
+    assert fast.content == slow.content
+    assert fast.headers["content-type"] == slow.headers["content-type"]
+    assert fast.headers.get("ETag") == slow.headers.get("ETag")
+
+
+async def test_fast_json_delta_matches_model_response(client, monkeypatch):
+    since = (await client.get("/api/todos/changes")).json()["data"]["next_since"]
+    await client.post("/api/todos/", json={"title": "a"})
+    todo_id = (await client.post("/api/todos/", json={"title": "b"})).json()["data"]["id"]
+    await client.delete(f"/api/todos/{todo_id}")
+    url = f"/api/todos/changes?since={since}"
+
+    monkeypatch.setattr(todos.settings, "FAST_JSON_RESPONSE", False)
+    slow = await client.get(url)
+    monkeypatch.setattr(todos.settings, "FAST_JSON_RESPONSE", True)
+    fast = await client.get(url)
+
+    assert slow.json()["data"]["deleted"] == [todo_id] and len(slow.json()["data"]["items"]) == 1
+    assert fast.content == slow.content
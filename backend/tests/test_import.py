@@ -0,0 +1,101 @@
+"""流式导入：行级错误、整体提交与写锁占用"""
+
+import asyncio
+
+import pytest
+import ujson
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import get_settings
+from app.crud import TodoCRUD
+
+settings = get_settings()
+
+
+def ndjson(*records) -> bytes:
+    return b"".join(ujson.dumps(record).encode() + b"\n" for record in records)
+
+
+async def test_import_reports_rejected_rows(client):
+    body = ndjson({"title": "a"}, {"description": "缺少标题"}, {"title": "b", "deadline": 100}) + b"{oops\n"
+    r = await client.post("/api/todos/import", content=body, params={"chunk_size": 1})
+    data = r.json()["data"]
+    assert (data["accepted"], data["rejected"]) == (2, 2)
+    assert [error["line"] for error in data["errors"]] == [2, 4]
+    assert (await client.get("/api/todos/stats")).json()["data"]["total"] == 2
+
+
+async def test_import_csv_with_utf8_bom(client):
+    """Excel 保存的 CSV 以 BOM 开头，表头的第一列仍能识别"""
+    body = "\ufefftitle,deadline\n买牛奶,100\nb,\n".encode()
+    r = await client.post("/api/todos/import", content=body, headers={"Content-Type": "text/csv"})
+    data = r.json()["data"]
+    assert (data["accepted"], data["rejected"]) == (2, 0)
+    r = await client.get("/api/todos/", params={"sort": "deadline", "order": "desc"})
+    assert [item["title"] for item in r.json()["data"]["items"]] == ["买牛奶", "b"]
+
+
+async def test_atomic_import_does_not_hold_writer_while_streaming(client):
+    """整体导入在读取请求体期间不占用写锁，其他写请求无需等待上传结束"""
+    created = {}
+
+    async def body():
+        yield ndjson({"title": "a"})
+        created["r"] = await asyncio.wait_for(client.post("/api/todos/", json={"title": "b"}), timeout=2)
+        yield ndjson({"title": "c"})
+
+    r = await client.post("/api/todos/import", content=body(), params={"atomic": True, "chunk_size": 1})
+    assert r.json()["data"]["accepted"] == 2
+    assert created["r"].json()["code"] == 201
+    assert (await client.get("/api/todos/stats")).json()["data"]["total"] == 3
+
+
+@pytest.mark.parametrize("atomic", [True, False])
+async def test_import_rejects_out_of_range_integers(client, atomic):
+    body = ndjson({"title": "a"}) + b'{"title": "b", "deadline": 1000000000000000000000000000000}\n'
+    r = await client.post("/api/todos/import", content=body, params={"atomic": atomic})
+    data = r.json()["data"]
+    assert (data["accepted"], data["rejected"]) == (1, 1)
+    assert data["errors"][0]["line"] == 2 and data["errors"][0]["msg"].startswith("deadline")
+
+
+async def test_chunked_import_reports_failed_chunk(client, monkeypatch):
+    """逐批提交时某批写入失败，该批计入 rejected，其余批次照常提交并返回汇总"""
+    insert_many = TodoCRUD.insert_many
+    calls = 0
+
+    async def flaky(self, session, *, todos_in):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise OperationalError("INSERT", {}, Exception("disk I/O error"))
+        return await insert_many(self, session, todos_in=todos_in)
+
+    monkeypatch.setattr(TodoCRUD, "insert_many", flaky)
+    body = ndjson(*({"title": str(i)} for i in range(5)))
+    r = await client.post("/api/todos/import", content=body, params={"atomic": False, "chunk_size": 2})
+    data = r.json()["data"]
+    assert r.json()["code"] == 201 and (data["accepted"], data["rejected"]) == (3, 2)
+    assert [error["line"] for error in data["errors"]] == [3, 4]
+    assert (await client.get("/api/todos/stats")).json()["data"]["total"] == 3
+
+
+async def test_import_rejects_overlong_line(client, monkeypatch):
+    """没有换行的请求体不会被整体缓冲，单行超过长度上限时拒绝请求"""
+    monkeypatch.setattr(settings, "IMPORT_MAX_LINE_BYTES", 64)
+
+    async def body():
+        for _ in range(100):
+            yield b"x" * 32
+
+    r = await client.post("/api/todos/import", content=body())
+    assert r.json()["code"] == 413
+
+    body = b'title\n"' + b"x\n" * 100  # 引号未闭合，记录跨越多行
+    r = await client.post("/api/todos/import", content=body, headers={"Content-Type": "text/csv"})
+    assert r.json()["code"] == 413
+
+    body = ndjson({"title": "a"}) + b"y" * 100
+    r = await client.post("/api/todos/import", content=body, params={"atomic": False, "chunk_size": 1})
+    assert r.json()["code"] == 413 and "1 条已提交" in r.json()["msg"]
+    assert (await client.get("/api/todos/stats")).json()["data"]["total"] == 1
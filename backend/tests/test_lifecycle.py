@@ -0,0 +1,69 @@
+"""数据库初始化：已有数据库升级时补建缺失的结构"""
+
+from sqlalchemy import text
+
+from app.core.database import async_write_engine, async_write_session_factory
+from app.core.lifecycle import db_init
+from app.crud import todo_crud
+from app.models import TODOS_FTS_DDL
+from tests.conftest import requires_sqlite
+
+
+@requires_sqlite
+async def test_schema_is_up_to_date_after_start():
+    """架构版本记录在 PRAGMA user_version 中，未变化时跳过建表（其他数据库每次执行幂等的建表检查）"""
+    assert await db_init() is False
+
+
+@requires_sqlite
+async def test_upgrade_creates_missing_fts_index(client):
+    """升级前的数据库没有全文索引表，升级后搜索可用且包含已有数据"""
+    await client.post("/api/todos/", json={"title": "hello world"})
+    async with async_write_engine.begin() as conn:
+        for trigger in ("todos_fts_ai", "todos_fts_ad", "todos_fts_au"):
+            await conn.execute(text(f"DROP TRIGGER {trigger}"))
+        await conn.execute(text("DROP TABLE todos_fts"))
+        await conn.execute(text("PRAGMA user_version = 0"))
+
+    assert await db_init() is True
+    r = await client.get("/api/todos/", params={"q": "world"})
+    assert [item["title"] for item in r.json()["data"]["items"]] == ["hello world"]
+    await client.post("/api/todos/", json={"title": "new world"})  # 触发器已补建
+    r = await client.get("/api/todos/", params={"q": "world"})
+    assert len(r.json()["data"]["items"]) == 2
+
+
+@requires_sqlite
+async def test_upgrade_rebuilds_todos_with_autoincrement(client):
+    """升级前的 todos 表不是 AUTOINCREMENT，升级后重建，已有数据、索引与全文索引保持可用且 ID 不再复用"""
+    r = await client.post("/api/todos/batch", json=[{"title": "hello world"}, {"title": "b"}, {"title": "c"}])
+    a, b, c = (item["id"] for item in r.json()["data"])
+    await client.put(f"/api/todos/{c}", json={"completed": True})
+    async with async_write_session_factory.begin() as session:
+        await todo_crud.archive(session, before=2**31)
+    async with async_write_engine.begin() as conn:
+        sql = await conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'todos'"))
+        legacy = sql.replace("CREATE TABLE todos ", "CREATE TABLE todos_legacy ").replace(" AUTOINCREMENT", "")
+        await conn.execute(text(legacy))
+        await conn.execute(text("INSERT INTO todos_legacy SELECT * FROM todos"))
+        await conn.execute(text("DROP TABLE todos"))
+        await conn.execute(text("ALTER TABLE todos_legacy RENAME TO todos"))
+        for statement in TODOS_FTS_DDL[1:-1]:
+            await conn.execute(text(statement))
+        await conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'todos'"))
+        await conn.execute(text("PRAGMA user_version = 0"))
+
+    assert await db_init() is True
+    async with async_write_engine.connect() as conn:
+        sql = await conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'todos'"))
+        indexes = {row[1] for row in await conn.execute(text("PRAGMA index_list(todos)"))}
+    assert "AUTOINCREMENT" in sql and "ix_todos_pending_deadline" in indexes
+    r = await client.get("/api/todos/", params={"q": "world"})
+    assert [item["id"] for item in r.json()["data"]["items"]] == [a]
+    assert (await client.get(f"/api/todos/{c}")).json()["data"]["title"] == "c"
+
+    await client.delete(f"/api/todos/{b}")
+    r = await client.post("/api/todos/", json={"title": "new world"})
+    assert r.json()["data"]["id"] > c
+    r = await client.get("/api/todos/", params={"q": "world"})
+    assert len(r.json()["data"]["items"]) == 2
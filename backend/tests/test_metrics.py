@@ -0,0 +1,44 @@
+"""指标：/metrics 以 Prometheus 文本格式输出请求与数据库指标，路由按模板聚合"""
+
+import re
+
+SAMPLE = re.compile(r"^(\w+)(\{.*\})? (\S+)$")
+
+
+async def scrape(client) -> dict[str, float]:
+    r = await client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in r.text.splitlines():
+        if line and not line.startswith("#"):
+            name, labels, value = SAMPLE.match(line).groups()
+            samples[name + (labels or "")] = float(value)
+    return samples
+
+
+async def test_metrics_count_requests_by_route_template(client):
+    ids = [(await client.post("/api/todos/", json={"title": t})).json()["data"]["id"] for t in "ab"]
+    before = await scrape(client)
+    for todo_id in ids:
+        await client.get(f"/api/todos/{todo_id}")
+    after = await scrape(client)
+
+    requests = 'http_requests_total{method="GET",route="/api/todos/{todo_id}",status="200"}'
+    assert after[requests] - before.get(requests, 0) == 2
+    assert not any(f"/api/todos/{ids[0]}" in name for name in after)
+
+    duration = 'http_request_duration_seconds_count{method="GET",route="/api/todos/{todo_id}"}'
+    assert after[duration] - before.get(duration, 0) == 2
+    inf = 'http_request_duration_seconds_bucket{method="GET",route="/api/todos/{todo_id}",le="+Inf"}'
+    assert after[inf] == after[duration]
+
+
+async def test_metrics_include_database_and_pool_gauges(client):
+    await client.get("/api/todos/")
+    samples = await scrape(client)
+    assert samples['db_queries_total{engine="reader"}'] > 0
+    assert samples['db_query_duration_seconds_count{engine="reader"}'] > 0
+    assert 'db_queries_per_request_count{method="GET",route="/api/todos/"}' in samples
+    assert samples['db_pool_size{engine="writer"}'] >= 1
+    assert samples["http_requests_in_progress"] == 1  # 正在处理的 /metrics 请求本身
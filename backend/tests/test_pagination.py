@@ -0,0 +1,95 @@
+"""列表分页：游标分页与偏移分页的结果一致"""
+
+import pytest
+from sqlalchemy import select, text
+
+from app.core.database import async_session_factory
+from app.core.pagination import encode_cursor
+from app.crud import _keyset_clauses, _order_page
+from app.models import Todo
+from app.schemas import TodoFilter
+from tests.conftest import requires_sqlite
+
+
+async def _collect_by_cursor(client, params: dict, size: int) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        r = await client.get("/api/todos/", params={**params, "size": size, **({"cursor": cursor} if cursor else {})})
+        data = r.json()["data"]
+        ids += [item["id"] for item in data["items"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("sort", ["id", "deadline", "created_at"])
+async def test_cursor_pages_match_offset_order(client, sort, order):
+    # 截止时间含 NULL 与重复值，覆盖游标跨越 NULL 段与非 NULL 段的情况
+    todos = [{"title": f"t{i}", "deadline": None if i % 3 == 0 else i * 7 % 20} for i in range(60)]
+    r = await client.post("/api/todos/batch", json=todos)
+    assert r.json()["code"] == 201
+
+    params = {"sort": sort, "order": order}
+    r = await client.get("/api/todos/", params={**params, "size": 100})
+    expected = [item["id"] for item in r.json()["data"]["items"]]
+    assert len(expected) == 60
+    assert await _collect_by_cursor(client, params, size=7) == expected
+
+
+async def test_cursor_rejects_other_sort(client):
+    await client.post("/api/todos/batch", json=[{"title": "a"}, {"title": "b"}])
+    r = await client.get("/api/todos/", params={"size": 1})
+    cursor = r.json()["data"]["next_cursor"]
+    r = await client.get("/api/todos/", params={"size": 1, "cursor": cursor, "sort": "deadline"})
+    assert r.json()["code"] == 400
+
+
+@pytest.mark.parametrize(
+    ("sort", "key", "todo_id"),
+    [
+        ("deadline", [1, 2], 1),
+        ("deadline", {"a": 1}, 1),
+        ("deadline", 10**30, 1),
+        ("deadline", 1.5, 1),
+        ("id", 1, True),
+        ("id", True, 1),
+        ("id", "1", 1),
+        ("id", 1, 2**63),
+        ("created_at", None, 1),
+    ],
+)
+async def test_cursor_rejects_malformed_key_or_id(client, sort, key, todo_id):
+    """游标中的排序键与 ID 必须是整数（可为空的排序字段允许 null），否则返回 400 而不是 500 或空页"""
+    await client.post("/api/todos/batch", json=[{"title": "a", "deadline": 1}, {"title": "b", "deadline": 2}])
+    cursor = encode_cursor(f"{sort}:asc", key, todo_id)
+    r = await client.get("/api/todos/", params={"size": 1, "sort": sort, "order": "asc", "cursor": cursor})
+    assert r.status_code == 200 and r.json()["code"] == 400
+
+
+async def test_cursor_accepts_null_deadline_key(client):
+    await client.post("/api/todos/batch", json=[{"title": "a"}, {"title": "b", "deadline": 2}])
+    cursor = encode_cursor("deadline:asc", None, 0)
+    r = await client.get("/api/todos/", params={"sort": "deadline", "order": "asc", "cursor": cursor})
+    assert [item["title"] for item in r.json()["data"]["items"]] == ["a", "b"]
+
+
+@pytest.mark.parametrize("key", [None, [1], 10**30])
+async def test_due_cursor_rejects_malformed_key(client, key):
+    r = await client.get("/api/todos/due", params={"cursor": encode_cursor("deadline:due", key, 1)})
+    assert r.json()["code"] == 400
+
+
+@requires_sqlite
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("key", [10, None])
+async def test_cursor_query_seeks_index(order, key):
+    """游标之后的每段查询都直接在索引上定位起点并按索引顺序读取，代价与页深无关"""
+    filters = TodoFilter(sort="deadline", order=order)
+    async with async_session_factory() as session:
+        for clause in _keyset_clauses(Todo.__table__, filters, (key, 100)):
+            stmt = _order_page(select(Todo.id).where(clause), Todo.__table__.c, filters, nulls=False).limit(10)
+            sql = str(stmt.compile(session.bind, compile_kwargs={"literal_binds": True}))
+            plan = " | ".join(row[-1] for row in await session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+            assert plan.startswith("SEARCH todos USING "), plan
+            assert "TEMP B-TREE" not in plan, plan
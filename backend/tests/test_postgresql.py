@@ -0,0 +1,92 @@
+"""PostgreSQL 专用路径：COPY 批量导入、ILIKE 搜索、连接参数与校准/逾期统计的锁"""
+
+import asyncio
+from time import time
+
+import ujson
+from sqlalchemy import text
+
+from app import crud
+from app.core.database import async_engine, async_write_engine, async_write_session_factory
+from app.crud import todo_crud
+from app.schemas import TodoCreate, TodoUpdate
+from tests.conftest import requires_postgresql
+
+pytestmark = requires_postgresql
+
+
+async def test_import_uses_copy_for_large_chunks(client, monkeypatch):
+    copied = []
+    copy_todos = crud.TodoCRUD._copy_todos
+
+    async def spy(self, session, todos_in):
+        copied.append(len(todos_in))
+        return await copy_todos(self, session, todos_in)
+
+    monkeypatch.setattr(crud.TodoCRUD, "_copy_todos", spy)
+    rows = crud.COPY_MIN_ROWS + 5
+    body = "\n".join(ujson.dumps({"title": f"t{i}", "deadline": i}) for i in range(rows))
+    r = await client.post("/api/todos/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert r.json()["data"]["accepted"] == rows
+    assert copied == [rows]
+
+    r = await client.get("/api/todos/", params={"size": 100, "sort": "deadline"})
+    data = r.json()["data"]
+    assert data["total"] == rows
+    assert [item["title"] for item in data["items"][:3]] == ["t0", "t1", "t2"]
+    assert all(item["completed"] is False and item["created_at"] for item in data["items"])
+    r = await client.post("/api/todos/", json={"title": "after"})
+    assert r.json()["data"]["id"] > max(item["id"] for item in data["items"])  # COPY 与序列分配的 ID 不冲突
+
+
+async def test_search_uses_case_insensitive_substring(client):
+    await client.post(
+        "/api/todos/batch",
+        json=[{"title": "Buy MILK"}, {"title": "milkshake"}, {"title": "100% done"}, {"title": "1000 done"}],
+    )
+    r = await client.get("/api/todos/", params={"q": "milk"})
+    assert sorted(item["title"] for item in r.json()["data"]["items"]) == ["Buy MILK", "milkshake"]
+    r = await client.get("/api/todos/", params={"q": "0%"})  # 通配符按字面匹配
+    assert [item["title"] for item in r.json()["data"]["items"]] == ["100% done"]
+
+
+async def test_connect_args_reach_server():
+    async with async_engine.connect() as conn:
+        read_only = await conn.scalar(text("SHOW default_transaction_read_only"))
+        application_name = await conn.scalar(text("SHOW application_name"))
+    async with async_write_engine.connect() as conn:
+        assert await conn.scalar(text("SHOW default_transaction_read_only")) == "off"
+    assert read_only == "on" and application_name.endswith(":reader")
+
+
+async def _blocked_until_commit(hold, write) -> None:
+    """hold 在未提交的事务中执行期间，write 必须等待，提交后才能完成"""
+    async with async_write_session_factory.begin() as session:
+        await hold(session)
+        task = asyncio.create_task(write())
+        await asyncio.sleep(0.2)
+        assert not task.done()
+    await asyncio.wait_for(task, 2)
+    async with async_write_session_factory.begin() as session:
+        assert await todo_crud.sync_counters(session) == {}
+
+
+async def _create(title: str, deadline: int | None = None) -> int:
+    async with async_write_session_factory.begin() as session:
+        return (await todo_crud.create(session, todo_in=TodoCreate(title=title, deadline=deadline))).id
+
+
+async def test_sync_counters_locks_out_writers():
+    """校准时 todos 表以 SHARE 模式锁定，写事务等待校准提交"""
+    await _blocked_until_commit(todo_crud.sync_counters, lambda: _create("a"))
+
+
+async def test_advance_overdue_blocks_counter_adjustment():
+    """推进逾期统计时间点时，修改逾期相关字段的写操作在时间点的共享锁上等待"""
+    todo_id = await _create("a", deadline=int(time()) - 10)
+
+    async def complete():
+        async with async_write_session_factory.begin() as session:
+            await todo_crud.update(session, todo_id=todo_id, todo_in=TodoUpdate(completed=True))
+
+    await _blocked_until_commit(lambda session: todo_crud.advance_overdue(session, until=int(time()) + 60), complete)
@@ -0,0 +1,14 @@
+"""慢查询日志：获取查询计划失败不影响所在事务"""
+
+from sqlalchemy import text
+
+from app.core.database import async_write_engine
+from app.core.profiling import _explain
+
+
+async def test_failed_explain_keeps_transaction_usable():
+    async with async_write_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        plan = await conn.run_sync(lambda sync_conn: _explain(sync_conn, "SELECT * FROM no_such_table", ()))
+        assert plan.startswith("（查询计划获取失败")
+        assert await conn.scalar(text("SELECT 42")) == 42
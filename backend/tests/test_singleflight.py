@@ -0,0 +1,52 @@
+"""单飞合并：相同键的并发调用只执行一次"""
+
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("k", load) for _ in range(10)))
+    assert results == [1] * 10 and len(flight) == 0
+    assert await flight.do("k", load) == 2  # 完成后不保留结果
+
+
+async def test_exception_is_shared():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+async def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def load():
+        started.set()
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("k", load))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await follower == "ok"
@@ -0,0 +1,101 @@
+"""统计计数器：随写操作维护的计数器与实际数据一致"""
+
+import asyncio
+from time import time
+
+from sqlalchemy import event
+
+from app.core.database import async_write_engine, async_write_session_factory
+from app.crud import todo_crud
+from app.schemas import TodoUpdate
+from tests.conftest import requires_postgresql
+
+
+async def _drift() -> dict:
+    async with async_write_session_factory.begin() as session:
+        return await todo_crud.sync_counters(session)
+
+
+async def test_counters_follow_writes(client):
+    past, future = int(time()) - 100, int(time()) + 3600
+    r = await client.post(
+        "/api/todos/batch",
+        json=[{"title": "a", "deadline": past}, {"title": "b", "deadline": future}, {"title": "c"}],
+    )
+    a, b, c = (item["id"] for item in r.json()["data"])
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert (stats["total"], stats["completed"], stats["pending"], stats["overdue"]) == (3, 0, 3, 1)
+
+    await client.put(f"/api/todos/{a}", json={"completed": True})
+    await client.put(f"/api/todos/{b}", json={"deadline": past})
+    await client.delete(f"/api/todos/{c}")
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert (stats["total"], stats["completed"], stats["pending"], stats["overdue"]) == (2, 1, 1, 1)
+    assert await _drift() == {}
+
+
+async def test_batch_update_transitions_do_not_drift(client):
+    past, future = int(time()) - 100, int(time()) + 3600
+    r = await client.post(
+        "/api/todos/batch",
+        json=[{"title": "a", "deadline": past}, {"title": "b", "deadline": future}, {"title": "c", "deadline": past}],
+    )
+    a, b, c = (item["id"] for item in r.json()["data"])
+    await client.put(f"/api/todos/{c}", json={"completed": True})
+    await client.patch(
+        "/api/todos/batch",
+        json=[
+            {"id": a, "deadline": None},
+            {"id": b, "deadline": past, "completed": True},
+            {"id": c, "completed": False},
+        ],
+    )
+    stats = (await client.get("/api/todos/stats")).json()["data"]
+    assert (stats["completed"], stats["overdue"]) == (1, 1)
+    assert await _drift() == {}
+
+
+async def test_update_does_not_read_old_state_separately(client):
+    """修改完成状态时原值在调整计数器的语句内读取，不单独执行 SELECT"""
+    todo_id = (await client.post("/api/todos/", json={"title": "a", "deadline": int(time()) - 100})).json()["data"][
+        "id"
+    ]
+    statements = []
+
+    def record(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(async_write_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with async_write_session_factory.begin() as session:
+            await todo_crud.update(session, todo_id=todo_id, todo_in=TodoUpdate(completed=True))
+    finally:
+        event.remove(async_write_engine.sync_engine, "before_cursor_execute", record)
+    assert not [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+    assert (await client.get("/api/todos/stats")).json()["data"]["overdue"] == 0
+    assert await _drift() == {}
+
+
+async def test_advance_overdue_counts_newly_due(client):
+    soon = int(time()) + 1
+    await client.post("/api/todos/", json={"title": "a", "deadline": soon})
+    async with async_write_session_factory.begin() as session:
+        assert await todo_crud.advance_overdue(session, until=soon) == 1
+    await asyncio.sleep(max(0, soon + 1 - time()))
+    assert (await client.get("/api/todos/stats")).json()["data"]["overdue"] == 1
+    assert await _drift() == {}
+
+
+@requires_postgresql
+async def test_concurrent_updates_of_same_todo_do_not_drift(client):
+    """PostgreSQL 下多个写连接并发修改同一 Todo，修改前的状态在行锁下读取"""
+    r = await client.post("/api/todos/batch", json=[{"title": str(i)} for i in range(5)])
+    ids = [item["id"] for item in r.json()["data"]]
+
+    async def toggle(todo_id: int, completed: bool):
+        async with async_write_session_factory.begin() as session:
+            await todo_crud.update(session, todo_id=todo_id, todo_in=TodoUpdate(completed=completed))
+
+    for _ in range(5):
+        await asyncio.gather(*(toggle(todo_id, completed) for todo_id in ids for completed in (True, False, True)))
+    assert await _drift() == {}
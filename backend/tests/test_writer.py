@@ -0,0 +1,68 @@
+"""写操作合并：同一窗口内的写操作合并为一个事务，单个操作失败不影响其他操作"""
+
+import asyncio
+
+from app import deps
+from app.core.database import async_session_factory, async_write_session_factory
+from app.core.exception import BizException
+from app.core.writer import WriteCoalescer, write_coalescer
+from app.crud import todo_crud
+from app.schemas import TodoCreate, TodoUpdate
+
+
+async def test_coalescer_batches_writes_and_isolates_failures():
+    coalescer = WriteCoalescer(async_write_session_factory, window=0.05, max_batch=64)
+    batches = []
+    commit = coalescer._commit
+
+    async def record(batch):
+        batches.append(len(batch))
+        await commit(batch)
+
+    coalescer._commit = record
+    await coalescer.start()
+    try:
+        results = await asyncio.gather(
+            coalescer.run(todo_crud.create, todo_in=TodoCreate(title="a")),
+            coalescer.run(todo_crud.update, todo_id=10**9, todo_in=TodoUpdate(title="x")),
+            coalescer.run(todo_crud.create, todo_in=TodoCreate(title="b")),
+            return_exceptions=True,
+        )
+    finally:
+        await coalescer.stop()
+
+    assert batches == [3]
+    assert isinstance(results[1], BizException) and results[1].code == 404
+    async with async_session_factory() as session:
+        for todo in (results[0], results[2]):
+            assert (await todo_crud.get(session, todo_id=todo.id))["title"] == todo.title
+
+
+async def test_coalescer_rejects_when_stopped():
+    coalescer = WriteCoalescer(async_write_session_factory, window=0.01, max_batch=4)
+    try:
+        await coalescer.run(todo_crud.create, todo_in=TodoCreate(title="a"))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("未启动的合并器应拒绝写操作")
+
+
+async def test_coalesced_request_does_not_open_write_session(client, monkeypatch):
+    """启用写操作合并时，写请求不再为自身打开（并占用准入名额的）写会话"""
+    opened = []
+
+    def factory():
+        opened.append(1)
+        return async_write_session_factory()
+
+    monkeypatch.setattr(deps, "async_write_session_factory", factory)
+    r = await client.post("/api/todos/", json={"title": "a"})
+    assert r.json()["code"] == 201 and len(opened) == 1  # 未启用合并时在请求自身的会话中执行
+
+    await write_coalescer.start()
+    try:
+        r = await client.post("/api/todos/", json={"title": "b"})
+    finally:
+        await write_coalescer.stop()
+    assert r.json()["code"] == 201 and len(opened) == 1
@@ -84,7 +84,7 @@ export default {
    */
   getTodos({ page = 1, size = 10, keyword = "", completed } = {}, config = {}) {
     return api.get("/todos", {
-      params: { page, size, keyword, completed },
+      params: { page, size, q: keyword, completed },
       ...config,
     });
   },